@@ -14,8 +14,10 @@ from typing import Any
 
 from mods_base import SETTINGS_DIR, HookType, build_mod
 
-from .mod_class import HuntTracker, coop_options
-from .osd import osd_option
+from .drop_stats import hunt_drop_stats
+from .mod_class import HuntTracker, coop_options, database_options, world_loaded_hook
+from .osd import osd_interval_option, osd_option
+from .search import hunt_search
 from .sqs import sq_hook
 from .tokens import (
     item_inspect_end_hook,
@@ -36,15 +38,19 @@ hooks: list[HookType[Any]] = [
     item_inspect_end_hook,
     item_inspect_start_hook,
     sq_hook,
+    world_loaded_hook,
 ]
 
 mod = build_mod(
     cls=HuntTracker,
     settings_file=SETTINGS_DIR / "hunt" / "hunt.json",
     hooks=hooks,
+    commands=[hunt_search, hunt_drop_stats],
     options=[
         redeem_token_option,
         osd_option,
+        osd_interval_option,
         coop_options,
+        database_options,
     ],
 )
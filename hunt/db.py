@@ -1,19 +1,294 @@
+import atexit
 import shutil
 import sqlite3
+import threading
+import time
+import traceback
+from collections import OrderedDict
 from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
-from mods_base import SETTINGS_DIR, open_in_mod_dir
+from mods_base import SETTINGS_DIR, BoolOption, open_in_mod_dir
+from unrealsdk import logging
 
+from .migrations import migrate
 from .native import drops
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Callable, Generator, Iterable, Sequence
 
 DB_PATH = SETTINGS_DIR / "hunt" / "hunt.sqlite3"
 DB_TEMPLATE_PATH = Path(__file__).parent / "hunt.sqlite3.template"
 
+# Opening a connection is relatively expensive - it has to stat the file, open it, read the
+# schema, and set up the WAL index - and we used to open one for pretty much every query, including
+# several per drop. Instead, we keep a pool of long lived connections around.
+#
+# There's a single write connection, shared between all threads, and guarded by a lock, so only one
+# thread may write at a time anyway. Reads get a dedicated connection per thread, so that they can
+# run concurrently with each other, and with writes (thanks to WAL).
+#
+# Idle connections don't hold a read transaction open, so they don't stop the WAL from being
+# checkpointed. We do still need to make sure to close all of them before replacing the db file.
+
+_pool_lock = threading.Lock()
+# Bumped every time the pool is closed, to invalidate any thread local connections
+_pool_generation: int = 0
+# The pool generation we last checked for migrations on
+_migrated_generation: int | None = None
+
+_write_lock = threading.RLock()
+_write_con: sqlite3.Connection | None = None
+
+_read_local = threading.local()
+# Every thread local read connection, so that we can close them when resetting. These are created
+# with `check_same_thread=False` purely so that we can close them from here, they're otherwise still
+# only ever used from the thread which created them.
+_read_cons: dict[threading.Thread, sqlite3.Connection] = {}
+
+
+def _connect(mode: Literal["r", "w"]) -> sqlite3.Connection:
+    """
+    Opens a new connection to the db, creating it if it doesn't exist, and migrating it if required.
+
+    Must be called while holding the pool lock.
+
+    Args:
+        mode: What mode to open the db in.
+    Returns:
+        The new connection.
+    """
+    global _migrated_generation
+
+    if not DB_PATH.exists():
+        _reset_db_file()
+
+    if _migrated_generation != _pool_generation:
+        con = sqlite3.connect(f"file:{DB_PATH}", uri=True)
+        try:
+            migrate(con)
+        finally:
+            con.close()
+        _migrated_generation = _pool_generation
+
+    read_only = "" if mode == "w" else "?mode=ro"
+    return sqlite3.connect(f"file:{DB_PATH}{read_only}", uri=True, check_same_thread=False)
+
+
+def _get_write_con() -> sqlite3.Connection:
+    """
+    Gets the shared write connection, opening it if required.
+
+    Must be called while holding the write lock.
+
+    Returns:
+        The write connection.
+    """
+    global _write_con
+    if _write_con is None:
+        with _pool_lock:
+            _write_con = _connect("w")
+    return _write_con
+
+
+def _get_read_con() -> sqlite3.Connection:
+    """
+    Gets the current thread's read connection, opening it if required.
+
+    Returns:
+        The read connection.
+    """
+    con: sqlite3.Connection | None = getattr(_read_local, "con", None)
+    if con is not None and getattr(_read_local, "generation", None) == _pool_generation:
+        return con
+
+    with _pool_lock:
+        # Clean up after any threads which have since finished
+        for thread in [thread for thread in _read_cons if not thread.is_alive()]:
+            _read_cons.pop(thread).close()
+
+        con = _connect("r")
+        _read_cons[threading.current_thread()] = con
+        _read_local.con = con
+        _read_local.generation = _pool_generation
+
+    return con
+
+
+def _close_pool() -> None:
+    """
+    Closes all pooled connections, to allow the file to be replaced.
+
+    Note connections will be re-opened the next time they're required.
+    """
+    global _write_con, _pool_generation
+
+    with _write_lock, _pool_lock:
+        if _write_con is not None:
+            _write_con.close()
+            _write_con = None
+
+        for con in _read_cons.values():
+            con.close()
+        _read_cons.clear()
+
+        _pool_generation += 1
+
+
+# Every write is normally it's own transaction, with it's own fsync, run on the game thread inside
+# a hook. When batching is enabled, writes which don't need a result are instead queued up, and
+# committed in groups on a background thread. Anything queued is always written before any other
+# write, so writes still happen in order.
+#
+# Reads never wait on the queue, they only see what's been committed so far - flushing there would
+# just move the commit straight back onto whichever thread is reading. Nothing which reads needs
+# the queued rows right away: once a batch commits, the write callbacks invalidate the cached
+# queries and refresh the OSD, so anything displaying them catches up then.
+
+GROUP_COMMIT_DELAY: float = 0.5
+
+_pending_cond = threading.Condition()
+_pending_writes: list[tuple[str, Sequence[Any]]] = []
+_writer_thread: threading.Thread | None = None
+
+
+@BoolOption(
+    "Batch Database Writes",
+    False,
+    description=(
+        "Rather than immediately writing every mission completion and mark to disk, collect them"
+        " in the background and write them in groups. This may help reduce stutters on slow"
+        " disks.\n"
+        "\n"
+        "Everything is always written before quitting to the main menu, or when disabling the mod."
+    ),
+)
+def batch_writes_option(_: BoolOption, enabled: bool) -> None:  # noqa: D103
+    if not enabled:
+        flush_writes()
+
+
+def _commit_pending_writes() -> bool:
+    """
+    Commits all queued writes, as a single transaction.
+
+    Must be called while holding the write lock.
+
+    Returns:
+        True if anything was written.
+    """
+    with _pending_cond:
+        batch = _pending_writes.copy()
+        _pending_writes.clear()
+    if not batch:
+        return False
+
+    con = _get_write_con()
+    for sql, params in batch:
+        # A failed statement is rolled back on it's own, it doesn't affect the rest of the batch
+        try:
+            con.execute(sql, params)
+        except sqlite3.Error:
+            logging.error("[HUNT] Failed to write queued statement:")
+            logging.error(sql)
+            logging.error(traceback.format_exc())
+    con.commit()
+    return True
+
+
+def flush_writes() -> None:
+    """Synchronously writes everything which is currently queued."""
+    with _write_lock:
+        any_written = _commit_pending_writes()
+    if any_written:
+        _on_write_callbacks()
+
+
+@atexit.register
+def _flush_writes_on_exit() -> None:
+    # The writer thread is a daemon, so make sure it doesn't take anything with it if we exit
+    # mid-batch. Skip the callbacks, there's nothing left to update.
+    with _write_lock:
+        _commit_pending_writes()
+
+
+def _writer_thread_loop() -> None:
+    while True:
+        with _pending_cond:
+            while not _pending_writes:
+                _pending_cond.wait()
+
+        # Give some more writes a chance to queue up, so they can share the same commit
+        time.sleep(GROUP_COMMIT_DELAY)
+        flush_writes()
+
+
+def queue_write(sql: str, params: Sequence[Any] = ()) -> None:
+    """
+    Queues up a single write statement, which doesn't need to return anything.
+
+    If batching is disabled, immediately writes the statement instead.
+
+    Args:
+        sql: The statement to run.
+        params: The statement's parameters.
+    """
+    global _writer_thread
+
+    if not batch_writes_option.value:
+        with open_db("w") as cur:
+            cur.execute(sql, params)
+        return
+
+    with _pending_cond:
+        _pending_writes.append((sql, params))
+
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(
+                target=_writer_thread_loop,
+                name="hunt db writer",
+                daemon=True,
+            )
+            _writer_thread.start()
+
+        _pending_cond.notify()
+
+
+# Callbacks to run once the current write transaction commits, or is rolled back. Only touched while
+# holding the write lock.
+_commit_callbacks: list[Callable[[], None]] = []
+_rollback_callbacks: list[Callable[[], None]] = []
+
+
+def on_commit(callback: Callable[[], None]) -> None:
+    """
+    Registers a callback to run once the current write transaction successfully commits.
+
+    If the transaction gets rolled back instead, the callback is discarded.
+
+    Must be called from within an `open_db("w")` block.
+
+    Args:
+        callback: The callback to run.
+    """
+    _commit_callbacks.append(callback)
+
+
+def on_rollback(callback: Callable[[], None]) -> None:
+    """
+    Registers a callback to run if the current write transaction gets rolled back.
+
+    If the transaction commits instead, the callback is discarded.
+
+    Must be called from within an `open_db("w")` block.
+
+    Args:
+        callback: The callback to run.
+    """
+    _rollback_callbacks.append(callback)
+
 
 @contextmanager
 def open_db(mode: Literal["r", "w"]) -> Generator[sqlite3.Cursor]:
@@ -25,34 +300,177 @@ def open_db(mode: Literal["r", "w"]) -> Generator[sqlite3.Cursor]:
     Returns:
         A new cursor for the db.
     """
-    if not DB_PATH.exists():
-        reset_db()
-
-    read_only = "" if mode == "w" else "?mode=ro"
-    con = sqlite3.connect(f"file:{DB_PATH}{read_only}", uri=True)
     if mode == "w":
-        cur = con.cursor()
+        with _write_lock:
+            # Make sure anything already queued gets written first, to keep everything in order
+            _commit_pending_writes()
+
+            con = _get_write_con()
+            cur = con.cursor()
+
+            commit_callbacks: list[Callable[[], None]] = []
+            rollback_callbacks: list[Callable[[], None]] = []
+            try:
+                yield cur
+                con.commit()
+                commit_callbacks = _commit_callbacks.copy()
+            except Exception:  # noqa: BLE001
+                con.rollback()
+                rollback_callbacks = _rollback_callbacks.copy()
+            finally:
+                _commit_callbacks.clear()
+                _rollback_callbacks.clear()
+                cur.close()
+
+        for callback in rollback_callbacks:
+            callback()
+        _on_write_callbacks(commit_callbacks)
 
+    else:
+        # Inside a render session, share it's cursor, so we keep seeing the same snapshot
+        session_cur: sqlite3.Cursor | None = getattr(_read_local, "session_cursor", None)
+        if session_cur is not None:
+            yield session_cur
+            return
+
+        cur = _get_read_con().cursor()
         try:
             yield cur
-            con.commit()
-        except Exception:  # noqa: BLE001
-            con.rollback()
         finally:
             cur.close()
 
-        _on_write_callbacks()
 
-    else:
-        cur = con.cursor()
-        yield cur
+@contextmanager
+def render_session() -> Generator[None]:
+    """
+    Context manager which runs all reads on the current thread within a single read transaction.
+
+    This means everything read during it sees the exact same state of the db, even if something
+    else writes to it in the meantime, and only needs to set up a single cursor.
+
+    Nested sessions simply re-use the outermost one.
+    """
+    if getattr(_read_local, "session_cursor", None) is not None:
+        yield
+        return
+
+    # Grab the generation first, so if there's a write before we take our snapshot, our reads are
+    # considered stale
+    generation = _write_generation
+
+    cur = _get_read_con().cursor()
+    try:
+        cur.execute("BEGIN")
+        # A transaction only actually takes it's snapshot on it's first read
+        cur.execute("SELECT 1 FROM MetaData LIMIT 1").fetchall()
+
+        _read_local.session_cursor = cur
+        _read_local.session_generation = generation
+        yield
+    finally:
+        _read_local.session_cursor = None
+        _read_local.session_generation = None
+        if cur.connection.in_transaction:
+            cur.connection.rollback()
         cur.close()
 
-    con.close()
 
+# The menu and OSD keep re-running the same queries, even though nothing's changed in between.
+# Since we're the only ones who ever write to the db, we can just keep track of how many times we've
+# written, and cache results until the next write.
+
+QUERY_CACHE_SIZE: int = 256
+
+
+@dataclass
+class CacheStats:
+    """
+    Diagnostic counters for a cache.
+
+    Args:
+        hits: How many lookups were served from the cache.
+        misses: How many lookups had to actually be calculated.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+
+query_cache_stats = CacheStats()
+
+_write_generation: int = 0
+_query_cache_lock = threading.Lock()
+_query_cache: OrderedDict[tuple[str, tuple[Any, ...]], tuple[int, tuple[tuple[Any, ...], ...]]] = (
+    OrderedDict()
+)
+
+
+def get_write_generation() -> int:
+    """
+    Gets the current write generation, which changes every time the db is written to.
+
+    Returns:
+        The current write generation.
+    """
+    return _write_generation
+
+
+def get_read_generation() -> int:
+    """
+    Gets the write generation which reads on the current thread will see.
+
+    This is normally just the current write generation, but may be older within a render session.
+
+    Returns:
+        The write generation reads will see.
+    """
+    session_generation: int | None = getattr(_read_local, "session_generation", None)
+    return _write_generation if session_generation is None else session_generation
+
+
+def cached_query(sql: str, params: Sequence[Any] = ()) -> tuple[tuple[Any, ...], ...]:
+    """
+    Runs a read query, re-using the results from last time if the db hasn't been written since.
+
+    Args:
+        sql: The query to run.
+        params: The query's parameters.
+    Returns:
+        All rows the query returned.
+    """
+    key = (sql, tuple(params))
+    with _query_cache_lock:
+        generation = get_read_generation()
+        entry = _query_cache.get(key)
+        if entry is not None and entry[0] == generation:
+            _query_cache.move_to_end(key)
+            query_cache_stats.hits += 1
+            return entry[1]
+        query_cache_stats.misses += 1
+
+    with open_db("r") as cur:
+        cur.execute(sql, params)
+        rows = tuple(cur.fetchall())
+
+    with _query_cache_lock:
+        # If there was a write while we were running the query, this entry will just never get hit
+        _query_cache[key] = (generation, rows)
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+    return rows
+
+
+def _reset_db_file() -> None:
+    """
+    Replaces the db file with a fresh copy of the template.
+
+    Must be called while holding the pool lock, after all connections have been closed.
+    """
+    global _migrated_generation
+    _migrated_generation = None
 
-def reset_db() -> None:
-    """Resets the db back to default."""
     drops.close_db()
 
     DB_PATH.parent.mkdir(exist_ok=True)
@@ -64,8 +482,9 @@ def reset_db() -> None:
     with open_in_mod_dir(DB_TEMPLATE_PATH, binary=True) as template, DB_PATH.open("wb") as db:
         shutil.copyfileobj(template, db)
 
-    with open_db("w") as cur:
-        cur.execute(
+    con = sqlite3.connect(f"file:{DB_PATH}", uri=True)
+    try:
+        con.execute(
             """
             INSERT INTO
                 MetaData (Key, Value)
@@ -73,6 +492,27 @@ def reset_db() -> None:
                 ("StartTime", datetime())
             """,
         )
+        con.commit()
+    finally:
+        con.close()
+
+
+def reset_db() -> None:
+    """Resets the db back to default."""
+    # Anything still queued is about to be wiped anyway. Drops are recorded while holding the write
+    # lock, so stop recording them first, to keep the same lock order.
+    with discard_pending_drops(), _write_lock:
+        with _pending_cond:
+            _pending_writes.clear()
+
+        _close_pool()
+        with _pool_lock:
+            _reset_db_file()
+        clear_item_index()
+        clear_mission_tokens()
+
+    # Every item may have changed
+    _on_write_callbacks((clear_item_option_cache,))
 
 
 @drops.set_db_getter
@@ -82,8 +522,23 @@ def native_db_getter() -> str:  # noqa: D103
     return str(DB_PATH)
 
 
+from .db_options import clear_item_option_cache  # noqa: E402
+from .drops import discard_pending_drops  # noqa: E402
+from .item_index import clear_item_index  # noqa: E402
+from .mod_class import request_options_rebuild  # noqa: E402
 from .osd import update_osd  # noqa: E402
+from .tokens import clear_mission_tokens  # noqa: E402
+
+
+def _on_write_callbacks(commit_callbacks: Iterable[Callable[[], None]] = ()) -> None:
+    global _write_generation
+    with _query_cache_lock:
+        _write_generation += 1
 
+    # Run these after bumping the generation, so anything read from before the write can no longer
+    # be cached after they've run
+    for callback in commit_callbacks:
+        callback()
 
-def _on_write_callbacks() -> None:
     update_osd()
+    request_options_rebuild()
@@ -1,31 +1,82 @@
+import json
+import threading
 import traceback
+from collections import OrderedDict
 from dataclasses import KW_ONLY, dataclass, field
-from functools import cache, cached_property
-from typing import TYPE_CHECKING
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
 from mods_base import BaseOption, ButtonOption, NestedOption
 
-from .db import open_db
+from .db import (
+    CacheStats,
+    cached_query,
+    get_read_generation,
+    get_write_generation,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Sequence
 
 
-# Cache this since the same item may exist in multiple maps
-@cache
-def create_item_option(item_id: int) -> BaseOption:
+# Cache these since the same item may exist in multiple maps, and since most items won't have
+# changed between opening the menu. Whenever an item is collected, the write which collected it
+# invalidates just it.
+ITEM_OPTION_CACHE_SIZE: int = 512
+
+item_option_cache_stats = CacheStats()
+
+_item_option_cache_lock = threading.Lock()
+_item_option_cache: OrderedDict[int, BaseOption] = OrderedDict()
+
+
+def clear_item_option_cache() -> None:
+    """Clears the cache of item options, so that they all get rebuilt with the latest stats."""
+    with _item_option_cache_lock:
+        _item_option_cache.clear()
+
+
+def invalidate_item_options(item_ids: Iterable[int]) -> None:
     """
-    Creates an option to display a single item.
+    Removes specific items from the item option cache, so they get rebuilt with the latest stats.
 
     Args:
-        item_id: The item to display.
+        item_ids: The items to invalidate.
+    """
+    with _item_option_cache_lock:
+        for item_id in item_ids:
+            _item_option_cache.pop(item_id, None)
+
+
+def create_item_options(item_ids: Sequence[int]) -> tuple[BaseOption, ...]:
+    """
+    Creates the options to display multiple items.
+
+    Any items which aren't already cached are all looked up using a single query.
+
+    Args:
+        item_ids: The items to display.
     Returns:
-        A new option.
+        A tuple of new options, in the same order as the given ids.
     """
-    with open_db("r") as cur:
-        cur.execute(
+    options: dict[int, BaseOption] = {}
+    missing_ids: list[int] = []
+    with _item_option_cache_lock:
+        generation = get_read_generation()
+        for item_id in dict.fromkeys(item_ids):
+            if (option := _item_option_cache.get(item_id)) is not None:
+                _item_option_cache.move_to_end(item_id)
+                options[item_id] = option
+                item_option_cache_stats.hits += 1
+            else:
+                missing_ids.append(item_id)
+                item_option_cache_stats.misses += 1
+
+    if missing_ids:
+        rows = cached_query(
             """
             SELECT
+                i.ID,
                 format(
                     '<img src="img://Game/UI/Menus/Debug/%s" width="18" height="18" alt="%s"/>  %s',
                     IIF(NumCollected <= 0,
@@ -54,14 +105,81 @@ def create_item_option(item_id: int) -> BaseOption:
                     )
                 END
             FROM
-                CollectedItems
-            WHERE
-                ID = ?
+                json_each(?) as j
+            INNER JOIN
+                CollectedItems as i ON i.ID = j.value
             """,
-            (item_id,),
+            (json.dumps(missing_ids),),
         )
-        title, description_title, description = cur.fetchone()
-        return ButtonOption(title, description_title=description_title, description=description)
+        for item_id, title, description_title, description in rows:
+            options[item_id] = ButtonOption(
+                title,
+                description_title=description_title,
+                description=description,
+            )
+
+        with _item_option_cache_lock:
+            # If there's been a write since the state we read, our results might be outdated, and
+            # the invalidation may have already happened, just don't cache them
+            if generation == get_write_generation():
+                for item_id in missing_ids:
+                    _item_option_cache[item_id] = options[item_id]
+                while len(_item_option_cache) > ITEM_OPTION_CACHE_SIZE:
+                    _item_option_cache.popitem(last=False)
+
+    return tuple(options[item_id] for item_id in item_ids)
+
+
+def create_item_option(item_id: int) -> BaseOption:
+    """
+    Creates an option to display a single item.
+
+    Args:
+        item_id: The item to display.
+    Returns:
+        A new option.
+    """
+    return create_item_options((item_id,))[0]
+
+
+@dataclass
+class ItemListOption(NestedOption):
+    """
+    A list of items, which is only looked up once opened.
+
+    Args:
+        sql: A query returning the ids of the items to show, in order.
+        params: The query's parameters.
+    """
+
+    _: KW_ONLY
+    sql: str
+    params: tuple[Any, ...] = ()
+
+    children: Sequence[BaseOption] = field(init=False, default_factory=tuple)  # type: ignore
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        del self.children
+
+    @cached_property
+    def children(self) -> Sequence[BaseOption]:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102, F811
+        try:
+            rows = cached_query(self.sql, self.params)
+            if not rows:
+                return (ButtonOption("Nothing to show"),)
+            return create_item_options([item_id for (item_id,) in rows])
+        except Exception:  # noqa: BLE001
+            return (
+                ButtonOption(
+                    "Failed to generate children!",
+                    description=traceback.format_exc(),
+                ),
+            )
+
+
+MISSING_ONLY_DESCRIPTION = "Only the items you haven't collected yet."
+BY_POINTS_DESCRIPTION = "All items, sorted by how many points they're worth."
 
 
 @dataclass
@@ -79,79 +197,110 @@ class MapOption(NestedOption):
     @cached_property
     def description(self) -> str:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102
         try:
-            with open_db("r") as cur:
-                cur.execute(
-                    """
-                    SELECT
-                        format(
-                            'Total: %d/%d (%d%%)%c%c%s',
-                            COUNT(*) FILTER (WHERE NumCollected > 0),
-                            COUNT(*),
-                            (
-                                100.0 * IFNULL(
-                                    SUM(Points) FILTER (WHERE NumCollected > 0),
-                                    0
-                                ) / SUM(Points)
-                            ),
-                            char(10),
-                            char(10),
+            rows = cached_query(
+                """
+                SELECT
+                    format(
+                        'Total: %d/%d (%d%%)%c%c%s',
+                        NumItemsCollected,
+                        NumItems,
+                        100.0 * CollectedPoints / TotalPoints,
+                        char(10),
+                        char(10),
+                        (
+                            SELECT
+                                GROUP_CONCAT(Summary, char(10))
+                            FROM
                             (
                                 SELECT
-                                    GROUP_CONCAT(Summary, char(10))
+                                    (
+                                        '<img src="img://Game/UI/Menus/Debug/'
+                                        || IIF(c.NumCollected > 0,
+                                                'T_HUD_MissionTrackerBoxChecked.T_HUD_MissionTrackerBoxChecked',
+                                                'T_HUD_MissionTrackerBoxUnchecked.T_HUD_MissionTrackerBoxUnchecked')
+                                        || '" width="18" height="18" alt="'
+                                        || IIF(c.NumCollected > 0, '[x]', '[  ]')
+                                        || '"/>  '
+                                        || i.Name
+                                    ) as Summary
                                 FROM
-                                (
-                                    SELECT
-                                        (
-                                            '<img src="img://Game/UI/Menus/Debug/'
-                                            || IIF(c.NumCollected > 0,
-                                                    'T_HUD_MissionTrackerBoxChecked.T_HUD_MissionTrackerBoxChecked',
-                                                    'T_HUD_MissionTrackerBoxUnchecked.T_HUD_MissionTrackerBoxUnchecked')
-                                            || '" width="18" height="18" alt="'
-                                            || IIF(c.NumCollected > 0, '[x]', '[  ]')
-                                            || '"/>  '
-                                            || i.Name
-                                        ) as Summary
-                                    FROM
-                                        CollectedLocations as c
-                                    LEFT JOIN
-                                        Items as i ON c.ItemID = i.ID
-                                    WHERE
-                                        c.MapID = ?
-                                    ORDER BY
-                                        c.ID
-                                )
+                                    CollectedLocations as c
+                                LEFT JOIN
+                                    Items as i ON c.ItemID = i.ID
+                                WHERE
+                                    c.MapID = ?
+                                ORDER BY
+                                    c.ID
                             )
                         )
-                    FROM
-                        CollectedLocations
-                    WHERE
-                        MapID = ?
-                    """,
-                    (self.map_id, self.map_id),
-                )
-                return cur.fetchone()[0]
+                    )
+                FROM
+                    MapSummary
+                WHERE
+                    MapID = ?
+                """,
+                (self.map_id, self.map_id),
+            )
+            return rows[0][0]
         except Exception:  # noqa: BLE001
             return "Failed to generate description!\n\n" + traceback.format_exc()
 
     @cached_property
     def children(self) -> Sequence[BaseOption]:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102, F811
         try:
-            with open_db("r") as cur:
-                cur.execute(
-                    """
+            rows = cached_query(
+                """
+                SELECT
+                    ItemID
+                FROM
+                    ItemLocations
+                WHERE
+                    MapID = ?
+                ORDER BY
+                    ID
+                """,
+                (self.map_id,),
+            )
+
+            return (
+                ItemListOption(
+                    "Missing Only",
+                    description=MISSING_ONLY_DESCRIPTION,
+                    sql="""
                     SELECT
-                        ItemID
+                        l.ItemID
                     FROM
-                        ItemLocations
+                        ItemLocations as l
+                    INNER JOIN
+                        ItemStats as s ON l.ItemID = s.ItemID
                     WHERE
-                        MapID = ?
+                        l.MapID = ?
+                        and s.NumCollected = 0
                     ORDER BY
-                        ID
+                        l.ID
                     """,
-                    (self.map_id,),
-                )
-
-                return tuple(create_item_option(item_id) for (item_id,) in cur.fetchall())
+                    params=(self.map_id,),
+                ),
+                ItemListOption(
+                    "By Points",
+                    description=BY_POINTS_DESCRIPTION,
+                    sql="""
+                    SELECT
+                        l.ItemID
+                    FROM
+                        ItemLocations as l
+                    INNER JOIN
+                        Items as i ON l.ItemID = i.ID
+                    WHERE
+                        l.MapID = ?
+                    ORDER BY
+                        i.Points DESC,
+                        i.Name
+                    """,
+                    params=(self.map_id,),
+                ),
+                *create_item_options([item_id for (item_id,) in rows]),
+            )
         except Exception:  # noqa: BLE001
             return (
                 ButtonOption(
@@ -176,89 +325,108 @@ class PlanetOption(NestedOption):
     @cached_property
     def description(self) -> str:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102
         try:
-            with open_db("r") as cur:
-                cur.execute(
-                    """
-                    SELECT
-                        format(
-                            'Total: %d/%d (%d%%)%c%c%s',
-                            COUNT(*) FILTER (WHERE NumCollected > 0),
-                            COUNT(*),
-                            (
-                                100.0 * IFNULL(
-                                    SUM(Points) FILTER (WHERE NumCollected > 0),
-                                    0
-                                ) / SUM(Points)
-                            ),
-                            char(10),
-                            char(10),
+            rows = cached_query(
+                """
+                SELECT
+                    format(
+                        'Total: %d/%d (%d%%)%c%c%s',
+                        NumItemsCollected,
+                        NumItems,
+                        100.0 * CollectedPoints / TotalPoints,
+                        char(10),
+                        char(10),
+                        (
+                            SELECT
+                                GROUP_CONCAT(Summary, char(10))
+                            FROM
                             (
                                 SELECT
-                                    GROUP_CONCAT(Summary, char(10))
+                                    format(
+                                        '%s: %d/%d (%d%%)',
+                                        m.Name,
+                                        s.NumItemsCollected,
+                                        s.NumItems,
+                                        100.0 * s.CollectedPoints / s.TotalPoints
+                                    ) as Summary
                                 FROM
-                                (
-                                    SELECT
-                                        format(
-                                            '%s: %d/%d (%d%%)',
-                                            MapName,
-                                            COUNT(*) FILTER (WHERE NumCollected > 0),
-                                            COUNT(*),
-                                            (
-                                                100.0 * IFNULL(
-                                                    SUM(Points) FILTER (WHERE NumCollected > 0),
-                                                    0
-                                                ) / SUM(Points)
-                                            )
-                                        ) as Summary
-                                    FROM
-                                        CollectedLocations
-                                    WHERE
-                                        PlanetID = ?
-                                    GROUP BY
-                                        MapID
-                                    ORDER BY
-                                        ID
-                                )
+                                    MapSummary as s
+                                INNER JOIN
+                                    Maps as m ON s.MapID = m.ID
+                                WHERE
+                                    s.PlanetID = ?
+                                ORDER BY
+                                    (SELECT MIN(ID) FROM ItemLocations WHERE MapID = s.MapID)
                             )
                         )
-                    FROM
-                        (
-                            SELECT
-                                *
-                            FROM
-                                CollectedLocations
-                            WHERE
-                                PlanetID = ?
-                            GROUP BY
-                                ItemID
-                        )
-                    """,
-                    (self.planet_id, self.planet_id),
-                )
-                return cur.fetchone()[0]
+                    )
+                FROM
+                    PlanetSummary
+                WHERE
+                    PlanetID = ?
+                """,
+                (self.planet_id, self.planet_id),
+            )
+            return rows[0][0]
         except Exception:  # noqa: BLE001
             return "Failed to generate description!\n\n" + traceback.format_exc()
 
     @cached_property
     def children(self) -> Sequence[BaseOption]:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102, F811
         try:
-            with open_db("r") as cur:
-                cur.execute(
-                    """
+            rows = cached_query(
+                """
+                SELECT DISTINCT
+                    MapName, MapID
+                FROM
+                    ItemLocations
+                WHERE
+                    PlanetID = ?
+                ORDER BY
+                    ID
+                """,
+                (self.planet_id,),
+            )
+            return (
+                ItemListOption(
+                    "Missing Only",
+                    description=MISSING_ONLY_DESCRIPTION,
+                    sql="""
+                    SELECT
+                        l.ItemID
+                    FROM
+                        ItemLocations as l
+                    INNER JOIN
+                        ItemStats as s ON l.ItemID = s.ItemID
+                    WHERE
+                        l.PlanetID = ?
+                        and s.NumCollected = 0
+                    GROUP BY
+                        l.ItemID
+                    ORDER BY
+                        MIN(l.ID)
+                    """,
+                    params=(self.planet_id,),
+                ),
+                ItemListOption(
+                    "By Points",
+                    description=BY_POINTS_DESCRIPTION,
+                    sql="""
                     SELECT DISTINCT
-                        MapName, MapID
+                        i.ID
                     FROM
-                        ItemLocations
+                        ItemLocations as l
+                    INNER JOIN
+                        Items as i ON l.ItemID = i.ID
                     WHERE
-                        PlanetID = ?
+                        l.PlanetID = ?
                     ORDER BY
-                        ID
+                        i.Points DESC,
+                        i.Name
                     """,
-                    (self.planet_id,),
-                )
-                return tuple(
-                    MapOption(map_name, map_id=map_id) for map_name, map_id in cur.fetchall()
-                )
+                    params=(self.planet_id,),
+                ),
+                *(MapOption(map_name, map_id=map_id) for map_name, map_id in rows),
+            )
         except Exception:  # noqa: BLE001
             return (
                 ButtonOption(
@@ -268,33 +436,73 @@ class PlanetOption(NestedOption):
             )
 
 
+# Splitting the full list into buckets means we only ever have to build and lay out the options for
+# the bucket that's actually opened. Anything not starting with a letter goes into '#'.
+FULL_ITEM_LIST_BUCKETS: tuple[tuple[str, str], ...] = (
+    ("A", "F"),
+    ("G", "L"),
+    ("M", "R"),
+    ("S", "Z"),
+    ("#", "#"),
+)
+
+
 @dataclass
 class FullItemListOption(NestedOption):
     children: Sequence[BaseOption] = field(init=False, default_factory=tuple)  # type: ignore
 
     def __post_init__(self) -> None:
         super().__post_init__()
-        del self.children
-
-    @cached_property
-    def children(self) -> Sequence[BaseOption]:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102, F811
-        try:
-            with open_db("r") as cur:
-                cur.execute(
-                    """
+        self.children = (
+            ItemListOption(
+                "Missing Only",
+                description=MISSING_ONLY_DESCRIPTION,
+                sql="""
+                SELECT
+                    i.ID
+                FROM
+                    ItemStats as s
+                -- Force using the partial index on missing items, rather than scanning every item
+                CROSS JOIN
+                    Items as i ON s.ItemID = i.ID
+                WHERE
+                    s.NumCollected = 0
+                ORDER BY
+                    i.Name
+                """,
+            ),
+            ItemListOption(
+                "By Points",
+                description=BY_POINTS_DESCRIPTION,
+                sql="""
+                SELECT
+                    ID
+                FROM
+                    Items
+                ORDER BY
+                    Points DESC,
+                    Name
+                """,
+            ),
+            *(
+                ItemListOption(
+                    first if first == last else f"{first} - {last}",
+                    sql="""
                     SELECT
                         ID
                     FROM
                         Items
+                    WHERE
+                        IIF(
+                            upper(substr(Name, 1, 1)) BETWEEN 'A' AND 'Z',
+                            upper(substr(Name, 1, 1)),
+                            '#'
+                        ) BETWEEN ? AND ?
                     ORDER BY
                         Name
                     """,
+                    params=(first, last),
                 )
-                return tuple(create_item_option(item_id) for (item_id,) in cur.fetchall())
-        except Exception:  # noqa: BLE001
-            return (
-                ButtonOption(
-                    "Failed to generate children!",
-                    description=traceback.format_exc(),
-                ),
-            )
+                for first, last in FULL_ITEM_LIST_BUCKETS
+            ),
+        )
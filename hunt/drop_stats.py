@@ -0,0 +1,123 @@
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+from mods_base import command
+from unrealsdk import logging
+
+from .db import query_cache_stats
+from .db_options import item_option_cache_stats
+from .native.drops import get_stats, reset_stats
+from .osd import output_file_stats
+
+if TYPE_CHECKING:
+    import argparse
+
+    from .db import CacheStats
+    from .native.drops import TimerStats
+
+
+def _percentile_bound(buckets: list[int], fraction: float) -> str:
+    """
+    Gets the bounds of the histogram bucket a percentile falls into.
+
+    Args:
+        buckets: The timer's histogram buckets.
+        fraction: The percentile to get, as a fraction.
+    Returns:
+        A string describing the bucket's bounds.
+    """
+    target = fraction * sum(buckets)
+    running_total = 0
+    for idx, count in enumerate(buckets):
+        running_total += count
+        if running_total >= target:
+            if idx == len(buckets) - 1:
+                return f">={2 ** (idx - 1)}us"
+            return f"<{2**idx}us"
+    return "?"
+
+
+def _format_timer(name: str, timer: TimerStats) -> str:
+    """
+    Formats a single timer's stats into a line to print.
+
+    Args:
+        name: The timer's name.
+        timer: The timer's stats.
+    Returns:
+        The formatted line.
+    """
+    count = timer["count"]
+    if count == 0:
+        return f"{name}: never run"
+
+    avg_us = timer["total_ns"] / count / 1000
+    max_us = timer["max_ns"] / 1000
+    return (
+        f"{name}: {count} runs, avg {avg_us:.1f}us,"
+        f" p50 {_percentile_bound(timer['buckets'], 0.5)},"
+        f" p99 {_percentile_bound(timer['buckets'], 0.99)},"
+        f" max {max_us:.1f}us"
+    )
+
+
+def _log_cache_stats(title: str, stats: CacheStats) -> None:
+    """
+    Logs a cache's hit and miss counts.
+
+    Args:
+        title: The title to log the stats under.
+        stats: The cache's stats.
+    """
+    logging.info(title)
+    logging.info(f"hits: {stats.hits}")
+    logging.info(f"misses: {stats.misses}")
+
+    lookups = stats.hits + stats.misses
+    if lookups > 0:
+        logging.info(f"hit_rate: {100 * stats.hits / lookups:.1f}%")
+
+
+@command(
+    description=(
+        "Shows how long the hunt tracker's native drop detection hooks are taking, how often the"
+        " on screen display text file gets written, and how often the query and item option caches"
+        " get hit."
+    ),
+)
+def hunt_drop_stats(args: argparse.Namespace) -> None:  # noqa: D103
+    stats = get_stats()
+    osd_writes = output_file_stats.writes
+    osd_skipped = output_file_stats.skipped
+    query_stats = replace(query_cache_stats)
+    item_option_stats = replace(item_option_cache_stats)
+    if args.reset:
+        reset_stats()
+        output_file_stats.writes = 0
+        output_file_stats.skipped = 0
+        query_cache_stats.hits = 0
+        query_cache_stats.misses = 0
+        item_option_cache_stats.hits = 0
+        item_option_cache_stats.misses = 0
+
+    logging.info("[HUNT] Drop detection counters:")
+    for name, count in stats["counters"].items():
+        logging.info(f"{name}: {count}")
+
+    logging.info("[HUNT] Drop detection timers:")
+    for name, timer in stats["timers"].items():
+        logging.info(_format_timer(name, timer))
+
+    logging.info("[HUNT] On screen display text file:")
+    logging.info(f"writes: {osd_writes}")
+    logging.info(f"skipped_unchanged: {osd_skipped}")
+
+    _log_cache_stats("[HUNT] Query cache:", query_stats)
+    _log_cache_stats("[HUNT] Item option cache:", item_option_stats)
+
+
+hunt_drop_stats.add_argument(
+    "--reset",
+    action="store_true",
+    help="Reset all stats back to zero after showing them.",
+)
@@ -1,58 +1,147 @@
 # ruff: noqa: D103
 
+import atexit
+import threading
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
 from mods_base import html_to_plain_text
 from ui_utils import show_hud_message
 from unrealsdk import logging
 
-from .db import open_db
+from .db import on_rollback, open_db
+from .item_index import (
+    ItemInfo,
+    get_item_info,
+    insert_collected,
+    queue_collected,
+    unqueue_collected,
+)
 from .native.drops import set_drop_callback
 
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+# Drops get reported on the game thread, right as you look at the item, so we don't want to wait on
+# the db there. Instead, they're queued up and recorded on a background thread, in order. The hud
+# message only needs the item index, which already counts queued drops, so we can still show it
+# straight away.
+
+_pending_drops_cond = threading.Condition()
+_pending_drops: deque[ItemInfo] = deque()
+_drop_thread: threading.Thread | None = None
+# Held while recording drops, so that a flush can't overtake drops the thread's already taken
+_record_lock = threading.Lock()
+
+
+def _format_drop_message(item: ItemInfo, num_collected: int) -> tuple[str, str, float]:
+    """
+    Formats the hud message to show after collecting an item.
+
+    Args:
+        item: The item which was collected.
+        num_collected: How many times the item's now been collected.
+    Returns:
+        A tuple of the message's title, it's contents, and how long to show it for.
+    """
+    if num_collected > 1:
+        return f"Duplicate {item.name}", f"Collected {num_collected} times", 4
+
+    message = f'<font color="#00ff00">+{item.points}</font> point{"s" if item.points > 1 else ""}'
+    # The first time you collect an item, partly base the duration of the message on the point
+    # value, let the more valuable stuff hang around a bit longer
+    return item.name, message, max(4, min(8, item.points))
+
+
+def _record_pending_drops() -> None:
+    """Records all currently queued drops, as a single transaction."""
+    with _record_lock:
+        with _pending_drops_cond:
+            items = list(_pending_drops)
+            _pending_drops.clear()
+        if not items:
+            return
+
+        started = False
+        try:
+            with open_db("w") as cur:
+                started = True
+                on_rollback(
+                    lambda: logging.error(
+                        "[HUNT] Failed to record drops: " + ", ".join(item.name for item in items),
+                    ),
+                )
+                for item in items:
+                    insert_collected(cur, item.id, queued=True)
+        except Exception:  # noqa: BLE001
+            # Once the transaction's started, it's callbacks take care of the queued counts -
+            # otherwise, we failed before even getting that far, so need to do it ourselves
+            if not started:
+                logging.error(
+                    "[HUNT] Failed to record drops: " + ", ".join(item.name for item in items),
+                )
+                for item in items:
+                    unqueue_collected(item.id)
+            logging.error(traceback.format_exc())
+
+
+def _drop_thread_loop() -> None:
+    while True:
+        with _pending_drops_cond:
+            while not _pending_drops:
+                _pending_drops_cond.wait()
+
+        _record_pending_drops()
+
+
+def flush_drops() -> None:
+    """Synchronously records all queued drops."""
+    _record_pending_drops()
+
+
+@contextmanager
+def discard_pending_drops() -> Generator[None]:
+    """
+    Context manager which discards all queued drops, and stops any drops being recorded within it.
+
+    Note this doesn't touch the item index's queued counts.
+    """
+    with _record_lock:
+        with _pending_drops_cond:
+            _pending_drops.clear()
+        yield
+
+
+# The recorder thread is a daemon, and doesn't otherwise get flushed if the game closes without a
+# save quit or disabling the mod, so make sure nothing it hasn't got to yet gets lost
+atexit.register(flush_drops)
+
 
 @set_drop_callback
 def on_valid_drop(bal_name: str) -> None:
-    with open_db("w") as cur:
-        cur.execute(
-            """
-            INSERT INTO
-                Collected (ItemID)
-            SELECT
-                ID
-            FROM
-                Items
-            WHERE
-                Balance = ?
-            """,
-            (bal_name,),
-        )
-
-    with open_db("r") as cur:
-        # The first time you collect an item, partly base the duration of the message on the point
-        # value, let the more valuable stuff hang around a bit longer
-        cur.execute(
-            """
-            SELECT
-                IIF(NumCollected > 1,
-                    'Duplicate ' || Name,
-                    Name
-                ),
-                IIF(NumCollected > 1,
-                    'Collected ' || NumCollected ||' times',
-                    '<font color="#00ff00">+'
-                        || Points
-                        || '</font> point'
-                        || IIF(Points > 1, 's', '')
-                ),
-                IIF(NumCollected > 1,
-                    4,
-                    MAX(4, MIN(8, Points))
-                )
-            FROM
-                CollectedItems
-            WHERE
-                Balance = ?
-            """,
-            (bal_name,),
-        )
-        title, message, duration = cur.fetchone()
-        show_hud_message(title, message, duration)
-        logging.info(html_to_plain_text(f"[HUNT] {title}: {message}"))
+    global _drop_thread
+
+    item = get_item_info(bal_name)
+    if item is None:
+        logging.warning(f"[HUNT] Got a drop for an unknown balance: {bal_name}")
+        return
+
+    # Count it as collected straight away, so nothing sees it as missing while it's queued
+    title, message, duration = _format_drop_message(item, queue_collected(item.id))
+    show_hud_message(title, message, duration)
+    logging.info(html_to_plain_text(f"[HUNT] {title}: {message}"))
+
+    with _pending_drops_cond:
+        _pending_drops.append(item)
+
+        if _drop_thread is None or not _drop_thread.is_alive():
+            _drop_thread = threading.Thread(
+                target=_drop_thread_loop,
+                name="hunt drop recorder",
+                daemon=True,
+            )
+            _drop_thread.start()
+
+        _pending_drops_cond.notify()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import timeit
+from argparse import ArgumentParser
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+# Compares opening a fresh connection per query, which the tracker used to do, against the pooled
+# connections `hunt.db` now uses. This replicates both access patterns directly on a scratch copy of
+# the template db, so that it can be run outside of the game.
+#
+# The pooled side mirrors everything `open_db` does per call, not just the query itself: the
+# context manager, the thread local connection and generation check, the render session lookup, and
+# on writes, checking the write queue, swapping out the commit callbacks, and bumping the write
+# generation. It doesn't include refreshing the OSD after a write, since that just hands off to a
+# background worker.
+#
+# Results depend heavily on the disk and the Python/sqlite versions - make sure to note them down
+# alongside any numbers.
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "hunt.sqlite3.template"
+
+READ_QUERY = "SELECT Tokens FROM AvailableTokens"
+WRITE_QUERY = "INSERT INTO StatMarks DEFAULT VALUES"
+
+
+class PooledDb:
+    """
+    A copy of the per call logic of `hunt.db.open_db`, running on pre-opened connections.
+
+    Args:
+        read_con: The long lived read connection to use.
+        write_con: The long lived write connection to use.
+    """
+
+    def __init__(self, read_con: sqlite3.Connection, write_con: sqlite3.Connection) -> None:
+        self.write_con = write_con
+        self.write_lock = threading.RLock()
+        self.pending_cond = threading.Condition()
+        self.pending_writes: list[tuple[str, tuple[object, ...]]] = []
+        self.commit_callbacks: list[Callable[[], None]] = []
+        self.generation_lock = threading.Lock()
+        self.write_generation = 0
+        self.pool_generation = 0
+
+        self.read_local = threading.local()
+        self.read_local.con = read_con
+        self.read_local.generation = self.pool_generation
+
+    def get_read_con(self) -> sqlite3.Connection:
+        """
+        Gets the current thread's read connection.
+
+        Returns:
+            The read connection.
+        """
+        con: sqlite3.Connection | None = getattr(self.read_local, "con", None)
+        if con is not None and getattr(self.read_local, "generation", None) == self.pool_generation:
+            return con
+        raise RuntimeError("Pooled read connection went missing!")
+
+    def commit_pending_writes(self) -> bool:
+        """
+        Commits all queued writes, as a single transaction.
+
+        Returns:
+            True if anything was written.
+        """
+        with self.pending_cond:
+            batch = self.pending_writes.copy()
+            self.pending_writes.clear()
+        if not batch:
+            return False
+        for sql, params in batch:
+            self.write_con.execute(sql, params)
+        self.write_con.commit()
+        return True
+
+    def on_write_callbacks(self, callbacks: list[Callable[[], None]]) -> None:
+        """
+        Bumps the write generation, and runs the commit callbacks.
+
+        Args:
+            callbacks: The callbacks to run.
+        """
+        with self.generation_lock:
+            self.write_generation += 1
+        for callback in callbacks:
+            callback()
+
+    @contextmanager
+    def open_db(self, mode: str) -> Generator[sqlite3.Cursor]:
+        """
+        Opens a cursor on the pooled connections.
+
+        Args:
+            mode: What mode to open the db in.
+        Returns:
+            A new cursor for the db.
+        """
+        if mode == "w":
+            with self.write_lock:
+                self.commit_pending_writes()
+
+                cur = self.write_con.cursor()
+                callbacks: list[Callable[[], None]] = []
+                try:
+                    yield cur
+                    self.write_con.commit()
+                    callbacks = self.commit_callbacks.copy()
+                except Exception:  # noqa: BLE001
+                    self.write_con.rollback()
+                finally:
+                    self.commit_callbacks.clear()
+                    cur.close()
+
+            self.on_write_callbacks(callbacks)
+
+        else:
+            session_cur: sqlite3.Cursor | None = getattr(self.read_local, "session_cursor", None)
+            if session_cur is not None:
+                yield session_cur
+                return
+
+            cur = self.get_read_con().cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+
+def make_benchmarks(
+    db_path: Path,
+    pooled_read_con: sqlite3.Connection,
+    pooled_write_con: sqlite3.Connection,
+) -> dict[str, Callable[[], None]]:
+    """
+    Creates the functions to benchmark.
+
+    Args:
+        db_path: The db to run against.
+        pooled_read_con: The long lived read connection to use.
+        pooled_write_con: The long lived write connection to use.
+    Returns:
+        A dict mapping benchmark names to the function to time.
+    """
+
+    def old_read() -> None:
+        assert db_path.exists()
+        con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        cur = con.cursor()
+        cur.execute(READ_QUERY)
+        cur.fetchall()
+        cur.close()
+        con.close()
+
+    def old_write() -> None:
+        assert db_path.exists()
+        con = sqlite3.connect(f"file:{db_path}", uri=True)
+        cur = con.cursor()
+        cur.execute(WRITE_QUERY)
+        con.commit()
+        cur.close()
+        con.close()
+
+    pool = PooledDb(pooled_read_con, pooled_write_con)
+
+    def new_read() -> None:
+        with pool.open_db("r") as cur:
+            cur.execute(READ_QUERY)
+            cur.fetchall()
+
+    def new_write() -> None:
+        with pool.open_db("w") as cur:
+            cur.execute(WRITE_QUERY)
+
+    return {
+        "old read": old_read,
+        "new read": new_read,
+        "old write": old_write,
+        "new write": new_write,
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark per query connections against pooled ones.")
+    parser.add_argument(
+        "--reads",
+        type=int,
+        default=2000,
+        help="How many reads to time per run.",
+    )
+    parser.add_argument(
+        "--writes",
+        type=int,
+        default=300,
+        help="How many writes to time per run.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="How many runs to take the minimum of.",
+    )
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, sqlite {sqlite3.sqlite_version}")  # noqa: T201
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "hunt.sqlite3"
+        shutil.copyfile(TEMPLATE_PATH, db_path)
+
+        with (
+            closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as read_con,
+            closing(sqlite3.connect(f"file:{db_path}", uri=True)) as write_con,
+        ):
+            for name, func in make_benchmarks(db_path, read_con, write_con).items():
+                number = args.reads if "read" in name else args.writes
+                func()  # Warm up
+                best = min(timeit.repeat(func, number=number, repeat=args.repeat)) / number
+                print(f"{name:10} {best * 1e6:8.1f} us/call")  # noqa: T201
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import csv
+import re
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
@@ -873,7 +874,7 @@ if __name__ == "__main__":
         INSERT INTO
             MetaData (Key, Value)
         VALUES
-            ("Schema", "1"),
+            ("Schema", "6"),
             ("Version", "2"),
             ("GeneratedTime", datetime())
         """,
@@ -995,6 +996,8 @@ if __name__ == "__main__":
                 ),
             )
 
+    cur.execute("CREATE INDEX ItemsPointsIndex ON Items(Points DESC, Name)")
+
     cur.execute(
         """
         CREATE TABLE Collected (
@@ -1007,31 +1010,89 @@ if __name__ == "__main__":
         """,
     )
     cur.execute("CREATE INDEX CollectedItemIDIndex ON Collected(ItemID)")
+    # Counting the collected items on every single read adds up quickly, so keep a running tally
+    # instead, updated by triggers
+    cur.execute(
+        """
+        CREATE TABLE ItemStats (
+            ItemID           INTEGER NOT NULL UNIQUE,
+            NumCollected     INTEGER NOT NULL DEFAULT 0,
+            FirstCollectTime TEXT,
+            PRIMARY KEY(ItemID),
+            FOREIGN KEY(ItemID) REFERENCES Items(ID)
+        )
+        """,
+    )
+    cur.execute("CREATE INDEX ItemStatsFirstCollectTimeIndex ON ItemStats(FirstCollectTime)")
+    cur.execute("CREATE INDEX ItemStatsMissingIndex ON ItemStats(ItemID) WHERE NumCollected = 0")
+    cur.execute("INSERT INTO ItemStats (ItemID) SELECT ID FROM Items")
+    cur.execute(
+        """
+        CREATE TRIGGER CollectedInsertItemStats AFTER INSERT ON Collected
+        BEGIN
+            UPDATE
+                ItemStats
+            SET
+                NumCollected = NumCollected + 1,
+                FirstCollectTime = IIF(
+                    FirstCollectTime IS NULL or NEW.CollectTime < FirstCollectTime,
+                    NEW.CollectTime,
+                    FirstCollectTime
+                )
+            WHERE
+                ItemID = NEW.ItemID;
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER CollectedDeleteItemStats AFTER DELETE ON Collected
+        BEGIN
+            UPDATE
+                ItemStats
+            SET
+                NumCollected = NumCollected - 1,
+                FirstCollectTime = (
+                    SELECT MIN(CollectTime) FROM Collected WHERE ItemID = OLD.ItemID
+                )
+            WHERE
+                ItemID = OLD.ItemID;
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER CollectedUpdateItemStats AFTER UPDATE OF ItemID, CollectTime ON Collected
+        BEGIN
+            UPDATE
+                ItemStats
+            SET
+                NumCollected = (
+                    SELECT COUNT(*) FROM Collected WHERE ItemID = ItemStats.ItemID
+                ),
+                FirstCollectTime = (
+                    SELECT MIN(CollectTime) FROM Collected WHERE ItemID = ItemStats.ItemID
+                )
+            WHERE
+                ItemID IN (OLD.ItemID, NEW.ItemID);
+        END
+        """,
+    )
     cur.execute(
         """
         CREATE VIEW CollectedItems AS
         SELECT
-            ID,
-            Name,
-            Description,
-            Points,
-            Balance,
-            (
-                SELECT COUNT(*) FROM Collected as c WHERE c.ItemID = i.ID
-            ) as NumCollected,
-            (
-                SELECT
-                    CollectTime
-                FROM
-                    Collected
-                WHERE
-                    ItemID = i.ID
-                ORDER BY
-                    CollectTime ASC
-                LIMIT 1
-            ) as FirstCollectTime
+            i.ID,
+            i.Name,
+            i.Description,
+            i.Points,
+            i.Balance,
+            s.NumCollected,
+            s.FirstCollectTime
         FROM
             Items as i
+        INNER JOIN
+            ItemStats as s ON i.ID = s.ItemID
         """,
     )
 
@@ -1191,6 +1252,25 @@ if __name__ == "__main__":
             (format_full_item_description(con, item_id), item_id),
         )
 
+    # Build a search index over the names and sources, now that we have the final descriptions
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE ItemSearch USING fts5(
+            Name,
+            Sources,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+    )
+    cur.execute("SELECT ID, Name, Description FROM Items")
+    for item_id, name, description in cur.fetchall():
+        _, _, sources = description.partition("<ul>")
+        cur.execute(
+            "INSERT INTO ItemSearch (rowid, Name, Sources) VALUES (?, ?, ?)",
+            (item_id, name, re.sub(r"<[^>]*>", "", sources.replace("</li>", "\n")).strip()),
+        )
+
     # We essentially pre-join the planet and maps table into this one for more efficient lookups at
     # runtime
     cur.execute(
@@ -1224,13 +1304,13 @@ if __name__ == "__main__":
             l.MapName,
             l.ItemID,
             i.Points,
-            (
-                SELECT COUNT(*) FROM Collected as c WHERE c.ItemID = i.ID
-            ) as NumCollected
+            s.NumCollected
         FROM
             ItemLocations as l
         LEFT JOIN
             Items as i ON l.ItemID = i.ID
+        LEFT JOIN
+            ItemStats as s ON l.ItemID = s.ItemID
         """,
     )
     for planet in OPTIONS_LAYOUT:
@@ -1303,6 +1383,111 @@ if __name__ == "__main__":
                 (planet_id, planet.name, map_id, map_name, world_name, *map_item_ids),
             )
 
+    # Keep running per-map/planet totals, so the options list doesn't need to aggregate them
+    cur.execute("CREATE INDEX ItemLocationsItemIDIndex ON ItemLocations(ItemID)")
+    cur.execute("CREATE INDEX ItemLocationsMapIDIndex ON ItemLocations(MapID)")
+
+    cur.execute(
+        """
+        CREATE TABLE MapSummary (
+            MapID             INTEGER NOT NULL UNIQUE,
+            PlanetID          INTEGER NOT NULL,
+            NumItems          INTEGER NOT NULL,
+            NumItemsCollected INTEGER NOT NULL,
+            TotalPoints       INTEGER NOT NULL,
+            CollectedPoints   INTEGER NOT NULL,
+            PRIMARY KEY(MapID),
+            FOREIGN KEY(MapID) REFERENCES Maps(ID),
+            FOREIGN KEY(PlanetID) REFERENCES Planets(ID)
+        )
+        """,
+    )
+    cur.execute(
+        """
+        INSERT INTO
+            MapSummary (
+                MapID, PlanetID, NumItems, NumItemsCollected, TotalPoints, CollectedPoints
+            )
+        SELECT
+            l.MapID,
+            l.PlanetID,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE s.NumCollected > 0),
+            SUM(i.Points),
+            IFNULL(SUM(i.Points) FILTER (WHERE s.NumCollected > 0), 0)
+        FROM
+            ItemLocations as l
+        INNER JOIN
+            Items as i ON l.ItemID = i.ID
+        INNER JOIN
+            ItemStats as s ON l.ItemID = s.ItemID
+        GROUP BY
+            l.MapID
+        """,
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE PlanetSummary (
+            PlanetID          INTEGER NOT NULL UNIQUE,
+            NumItems          INTEGER NOT NULL,
+            NumItemsCollected INTEGER NOT NULL,
+            TotalPoints       INTEGER NOT NULL,
+            CollectedPoints   INTEGER NOT NULL,
+            PRIMARY KEY(PlanetID),
+            FOREIGN KEY(PlanetID) REFERENCES Planets(ID)
+        )
+        """,
+    )
+    cur.execute(
+        """
+        INSERT INTO
+            PlanetSummary (PlanetID, NumItems, NumItemsCollected, TotalPoints, CollectedPoints)
+        SELECT
+            l.PlanetID,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE s.NumCollected > 0),
+            SUM(i.Points),
+            IFNULL(SUM(i.Points) FILTER (WHERE s.NumCollected > 0), 0)
+        FROM
+            (SELECT DISTINCT PlanetID, ItemID FROM ItemLocations) as l
+        INNER JOIN
+            Items as i ON l.ItemID = i.ID
+        INNER JOIN
+            ItemStats as s ON l.ItemID = s.ItemID
+        GROUP BY
+            l.PlanetID
+        """,
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER ItemStatsUpdateSummaries AFTER UPDATE OF NumCollected ON ItemStats
+        WHEN (OLD.NumCollected > 0) != (NEW.NumCollected > 0)
+        BEGIN
+            UPDATE
+                MapSummary
+            SET
+                NumItemsCollected = NumItemsCollected + IIF(NEW.NumCollected > 0, 1, -1),
+                CollectedPoints = CollectedPoints + IIF(NEW.NumCollected > 0, 1, -1) * (
+                    SELECT Points FROM Items WHERE ID = NEW.ItemID
+                )
+            WHERE
+                MapID IN (SELECT MapID FROM ItemLocations WHERE ItemID = NEW.ItemID);
+
+            UPDATE
+                PlanetSummary
+            SET
+                NumItemsCollected = NumItemsCollected + IIF(NEW.NumCollected > 0, 1, -1),
+                CollectedPoints = CollectedPoints + IIF(NEW.NumCollected > 0, 1, -1) * (
+                    SELECT Points FROM Items WHERE ID = NEW.ItemID
+                )
+            WHERE
+                PlanetID IN (SELECT PlanetID FROM ItemLocations WHERE ItemID = NEW.ItemID);
+        END
+        """,
+    )
+
     # Again, pre-join the planet/map names
     cur.execute(
         """
@@ -1427,31 +1612,121 @@ if __name__ == "__main__":
             """,
             row,
         )
+
+    # Keep a running token balance, so reading it doesn't need to re-aggregate every mission
+    cur.execute(
+        """
+        CREATE INDEX CompletedMissionsMissionClassIndex ON CompletedMissions(MissionClass)
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TABLE TokenLedger (
+            ID     INTEGER NOT NULL UNIQUE CHECK (ID = 1),
+            Tokens INTEGER NOT NULL,
+            PRIMARY KEY(ID)
+        )
+        """,
+    )
+    # You start with a single token
+    cur.execute("INSERT INTO TokenLedger (ID, Tokens) VALUES (1, 1)")
+    cur.execute(
+        """
+        CREATE TRIGGER CompletedMissionsInsertTokenLedger AFTER INSERT ON CompletedMissions
+        BEGIN
+            UPDATE
+                TokenLedger
+            SET
+                Tokens = Tokens + IFNULL(
+                    (
+                        SELECT
+                            IIF(
+                                EXISTS (
+                                    SELECT
+                                        1
+                                    FROM
+                                        CompletedMissions as c
+                                    WHERE
+                                        c.MissionClass = NEW.MissionClass
+                                        and c.ID != NEW.ID
+                                ),
+                                t.SubsequentTokens,
+                                t.InitialTokens
+                            )
+                        FROM
+                            MissionTokens as t
+                        WHERE
+                            t.MissionClass = NEW.MissionClass
+                    ),
+                    0
+                );
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER TokenRedeemsInsertTokenLedger AFTER INSERT ON TokenRedeems
+        BEGIN
+            UPDATE TokenLedger SET Tokens = Tokens - 1;
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER TokenRedeemsDeleteTokenLedger AFTER DELETE ON TokenRedeems
+        BEGIN
+            UPDATE TokenLedger SET Tokens = Tokens + 1;
+        END
+        """,
+    )
+    # Deletes and updates are rare, and can change which completion counts as the first, so these
+    # just recalculate the whole balance from scratch
+    for name, event in (
+        ("CompletedMissionsDeleteTokenLedger", "DELETE ON CompletedMissions"),
+        ("CompletedMissionsUpdateTokenLedger", "UPDATE OF MissionClass ON CompletedMissions"),
+        ("MissionTokensInsertTokenLedger", "INSERT ON MissionTokens"),
+        ("MissionTokensDeleteTokenLedger", "DELETE ON MissionTokens"),
+        ("MissionTokensUpdateTokenLedger", "UPDATE ON MissionTokens"),
+    ):
+        cur.execute(
+            f"""
+            CREATE TRIGGER {name} AFTER {event}
+            BEGIN
+                UPDATE
+                    TokenLedger
+                SET
+                    Tokens = (
+                        SELECT
+                            IFNULL(SUM(Tokens), 0)
+                            + 1
+                            - IFNULL((SELECT COUNT(*) FROM TokenRedeems), 0)
+                        FROM
+                        (
+                            SELECT
+                                CASE COUNT(*)
+                                    WHEN 0 THEN 0
+                                    WHEN 1 THEN t.InitialTokens
+                                    ELSE t.InitialTokens + (t.SubsequentTokens * (COUNT(*) - 1))
+                                END as Tokens
+                            FROM
+                                MissionTokens as t
+                            INNER JOIN
+                                CompletedMissions as c ON t.MissionClass = c.MissionClass
+                            GROUP BY
+                                t.ID
+                        )
+                    );
+            END
+            """,  # noqa: S608
+        )
+
     cur.execute(
         """
         CREATE VIEW AvailableTokens AS
         SELECT
-            (
-                IFNULL(SUM(Tokens), 0)
-                + 1
-                - IFNULL((SELECT COUNT(*) FROM TokenRedeems), 0)
-            )
-            as Tokens
+            Tokens
         FROM
-        (
-            SELECT
-                CASE COUNT(*)
-                    WHEN 0 THEN 0
-                    WHEN 1 THEN t.InitialTokens
-                    ELSE t.InitialTokens + (t.SubsequentTokens * (COUNT(*) - 1))
-                END as Tokens
-            FROM
-                MissionTokens as t
-            INNER JOIN
-                CompletedMissions as c ON t.MissionClass = c.MissionClass
-            GROUP BY
-                t.ID
-        )
+            TokenLedger
         """,
     )
 
@@ -0,0 +1,221 @@
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .db import on_commit, on_rollback, open_db
+from .db_options import invalidate_item_options
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# Drops and item inspections happen on the game thread, and need to know about an item from just
+# it's balance. Rather than going through the db every time, we load all items into memory once,
+# and keep track of the collected counts ourselves. Everything which inserts into `Collected` must
+# go through `insert_collected` to keep the counts in sync.
+#
+# Drops are recorded in the background, so we also count those which have been queued but not yet
+# committed, so that an item which was just dropped already counts as collected.
+
+
+@dataclass(frozen=True)
+class ItemInfo:
+    """
+    The static info about a single item.
+
+    Args:
+        id: The item's id.
+        name: The item's name.
+        points: How many points the item is worth.
+    """
+
+    id: int
+    name: str
+    points: int
+
+
+_index_lock = threading.Lock()
+# Keyed on the lowercased balance, since the db treats them as case insensitive
+_items_by_balance: dict[str, ItemInfo] | None = None
+# Indexed by item id
+_num_collected: list[int] = []
+# Keyed by item id, only contains items with drops queued
+_num_queued: dict[int, int] = {}
+# Bumped every time the index is cleared, or a count changes while it isn't loaded, so that a load
+# which raced with either doesn't install stale data
+_index_generation: int = 0
+
+
+def _load_index() -> tuple[dict[str, ItemInfo], list[int]]:
+    """
+    Gets the item index, loading it from the db if it isn't already loaded.
+
+    Returns:
+        A tuple of the items by balance, and the collected counts by item id.
+    """
+    global _items_by_balance, _num_collected
+
+    with _index_lock:
+        if _items_by_balance is not None:
+            return _items_by_balance, _num_collected
+        generation = _index_generation
+
+    # Don't hold the lock while reading, so a slow read can't block anything clearing the index
+    with open_db("r") as cur:
+        cur.execute(
+            """
+            SELECT
+                i.Balance, i.ID, i.Name, i.Points, s.NumCollected
+            FROM
+                Items as i
+            INNER JOIN
+                ItemStats as s ON i.ID = s.ItemID
+            """,
+        )
+        rows = cur.fetchall()
+
+    items_by_balance: dict[str, ItemInfo] = {}
+    num_collected = [0] * (max((row[1] for row in rows), default=0) + 1)
+    for balance, item_id, name, points, count in rows:
+        items_by_balance[balance.lower()] = ItemInfo(item_id, name, points)
+        num_collected[item_id] = count
+
+    with _index_lock:
+        if _items_by_balance is None and generation == _index_generation:
+            _items_by_balance = items_by_balance
+            _num_collected = num_collected
+    return items_by_balance, num_collected
+
+
+def get_item_info(balance: str) -> ItemInfo | None:
+    """
+    Looks up an item by it's balance.
+
+    Args:
+        balance: The path name of the item's balance.
+    Returns:
+        The item's info, or None if the balance isn't a hunt item.
+    """
+    items_by_balance, _ = _load_index()
+    return items_by_balance.get(balance.lower())
+
+
+def get_num_collected(item_id: int) -> int:
+    """
+    Gets how many times an item has been collected, including drops which are still queued.
+
+    Args:
+        item_id: The item's id.
+    Returns:
+        The amount of times it's been collected.
+    """
+    _, num_collected = _load_index()
+    with _index_lock:
+        return num_collected[item_id] + _num_queued.get(item_id, 0)
+
+
+def queue_collected(item_id: int) -> int:
+    """
+    Marks that an item's been queued to be collected.
+
+    The queued collect must be recorded by passing `queued=True` to `insert_collected`.
+
+    Args:
+        item_id: The item's id.
+    Returns:
+        The amount of times it's been collected, including this collect.
+    """
+    with _index_lock:
+        _num_queued[item_id] = _num_queued.get(item_id, 0) + 1
+    return get_num_collected(item_id)
+
+
+def _remove_queued(item_id: int) -> None:
+    """
+    Removes a single queued collect of an item.
+
+    Must be called while holding the index lock.
+
+    Args:
+        item_id: The item's id.
+    """
+    remaining = _num_queued.pop(item_id, 0) - 1
+    if remaining > 0:
+        _num_queued[item_id] = remaining
+
+
+def unqueue_collected(item_id: int) -> None:
+    """
+    Removes a single queued collect of an item, which wasn't recorded after all.
+
+    Args:
+        item_id: The item's id.
+    """
+    with _index_lock:
+        _remove_queued(item_id)
+
+
+def insert_collected(cur: sqlite3.Cursor, item_id: int, *, queued: bool = False) -> tuple[int, int]:
+    """
+    Inserts an item into `Collected`, as part of the cursor's current write transaction.
+
+    Once the transaction commits, updates the index with the collected count read back from within
+    it, and invalidates the item's cached option.
+
+    Args:
+        cur: The write cursor to use.
+        item_id: The item's id.
+        queued: True if this is recording a collect previously passed to `queue_collected`. It stops
+                counting as queued once the transaction finishes, whether it commits or not.
+    Returns:
+        A tuple of the new collected id, and the new amount of times the item's been collected.
+    """
+    cur.execute(
+        """
+        INSERT INTO
+            Collected (ItemID)
+        VALUES
+            (?)
+        RETURNING
+            ID
+        """,
+        (item_id,),
+    )
+    (collected_id,) = cur.fetchone()
+
+    # RETURNING is evaluated before the insert triggers run, so it can't give us the new count
+    cur.execute("SELECT NumCollected FROM ItemStats WHERE ItemID = ?", (item_id,))
+    (num_collected,) = cur.fetchone()
+
+    def update_index() -> None:
+        global _index_generation
+        # Don't try load the index here - if it's not loaded, it'll read the new count when it is.
+        # Do make sure a load which started before the commit doesn't install the old count though.
+        with _index_lock:
+            if _items_by_balance is None:
+                _index_generation += 1
+            else:
+                _num_collected[item_id] = num_collected
+            # Swap from queued to committed at the same time, so nothing sees it counted twice
+            if queued:
+                _remove_queued(item_id)
+        invalidate_item_options((item_id,))
+
+    on_commit(update_index)
+
+    if queued:
+        on_rollback(lambda: unqueue_collected(item_id))
+
+    return collected_id, num_collected
+
+
+def clear_item_index() -> None:
+    """
+    Clears the item index, so that it gets reloaded from the db next time it's required.
+
+    Also forgets about all queued collects, so this should only be used once they've been discarded.
+    """
+    global _items_by_balance, _index_generation
+    with _index_lock:
+        _items_by_balance = None
+        _num_queued.clear()
+        _index_generation += 1
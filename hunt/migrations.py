@@ -0,0 +1,478 @@
+import re
+import sqlite3
+from collections.abc import Callable
+
+from unrealsdk import logging
+
+# Anything which changes the db schema must be done both in the generation script, and as a
+# migration here, so that existing databases (and older templates) get upgraded too. Migrations are
+# keyed on the schema version they upgrade *from*.
+
+Migration = Callable[[sqlite3.Cursor], None]
+
+MIGRATIONS: dict[int, Migration] = {}
+
+
+def migration(from_version: int) -> Callable[[Migration], Migration]:
+    """
+    Decorator to register a migration.
+
+    Args:
+        from_version: The schema version this migration upgrades from.
+    Returns:
+        A decorator, which registers the migration, and returns it unchanged.
+    """
+
+    def decorator(func: Migration) -> Migration:
+        MIGRATIONS[from_version] = func
+        return func
+
+    return decorator
+
+
+def migrate(con: sqlite3.Connection) -> None:
+    """
+    Upgrades a database to the latest schema version, if required.
+
+    Args:
+        con: A writable connection to the db to upgrade.
+    """
+    cur = con.cursor()
+    try:
+        cur.execute("SELECT CAST(Value AS INT) FROM MetaData WHERE Key = 'Schema'")
+        (version,) = cur.fetchone()
+
+        if version not in MIGRATIONS:
+            return
+
+        # Do all migrations in a single transaction, so we never leave the db half upgraded
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            while version in MIGRATIONS:
+                logging.info(f"[HUNT] Migrating database from schema {version} to {version + 1}")
+                MIGRATIONS[version](cur)
+                version += 1
+
+            cur.execute("UPDATE MetaData SET Value = ? WHERE Key = 'Schema'", (str(version),))
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+    finally:
+        cur.close()
+
+
+@migration(1)
+def add_item_stats(cur: sqlite3.Cursor) -> None:
+    """Replaces the per-item correlated subqueries in `CollectedItems` with a trigger-kept table."""
+    cur.execute(
+        """
+        CREATE TABLE ItemStats (
+            ItemID           INTEGER NOT NULL UNIQUE,
+            NumCollected     INTEGER NOT NULL DEFAULT 0,
+            FirstCollectTime TEXT,
+            PRIMARY KEY(ItemID),
+            FOREIGN KEY(ItemID) REFERENCES Items(ID)
+        )
+        """,
+    )
+    cur.execute("CREATE INDEX ItemStatsFirstCollectTimeIndex ON ItemStats(FirstCollectTime)")
+    cur.execute(
+        """
+        INSERT INTO
+            ItemStats (ItemID, NumCollected, FirstCollectTime)
+        SELECT
+            i.ID,
+            COUNT(c.ID),
+            MIN(c.CollectTime)
+        FROM
+            Items as i
+        LEFT JOIN
+            Collected as c ON i.ID = c.ItemID
+        GROUP BY
+            i.ID
+        """,
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER CollectedInsertItemStats AFTER INSERT ON Collected
+        BEGIN
+            UPDATE
+                ItemStats
+            SET
+                NumCollected = NumCollected + 1,
+                FirstCollectTime = IIF(
+                    FirstCollectTime IS NULL or NEW.CollectTime < FirstCollectTime,
+                    NEW.CollectTime,
+                    FirstCollectTime
+                )
+            WHERE
+                ItemID = NEW.ItemID;
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER CollectedDeleteItemStats AFTER DELETE ON Collected
+        BEGIN
+            UPDATE
+                ItemStats
+            SET
+                NumCollected = NumCollected - 1,
+                FirstCollectTime = (
+                    SELECT MIN(CollectTime) FROM Collected WHERE ItemID = OLD.ItemID
+                )
+            WHERE
+                ItemID = OLD.ItemID;
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER CollectedUpdateItemStats AFTER UPDATE OF ItemID, CollectTime ON Collected
+        BEGIN
+            UPDATE
+                ItemStats
+            SET
+                NumCollected = (
+                    SELECT COUNT(*) FROM Collected WHERE ItemID = ItemStats.ItemID
+                ),
+                FirstCollectTime = (
+                    SELECT MIN(CollectTime) FROM Collected WHERE ItemID = ItemStats.ItemID
+                )
+            WHERE
+                ItemID IN (OLD.ItemID, NEW.ItemID);
+        END
+        """,
+    )
+
+    cur.execute("DROP VIEW CollectedItems")
+    cur.execute(
+        """
+        CREATE VIEW CollectedItems AS
+        SELECT
+            i.ID,
+            i.Name,
+            i.Description,
+            i.Points,
+            i.Balance,
+            s.NumCollected,
+            s.FirstCollectTime
+        FROM
+            Items as i
+        INNER JOIN
+            ItemStats as s ON i.ID = s.ItemID
+        """,
+    )
+
+    cur.execute("DROP VIEW CollectedLocations")
+    cur.execute(
+        """
+        CREATE VIEW CollectedLocations AS
+        SELECT
+            l.ID,
+            l.PlanetID,
+            l.MapID,
+            l.MapName,
+            l.ItemID,
+            i.Points,
+            s.NumCollected
+        FROM
+            ItemLocations as l
+        LEFT JOIN
+            Items as i ON l.ItemID = i.ID
+        LEFT JOIN
+            ItemStats as s ON l.ItemID = s.ItemID
+        """,
+    )
+
+
+@migration(2)
+def add_summaries(cur: sqlite3.Cursor) -> None:
+    """Adds trigger-kept per-map and per-planet summaries, for the options list descriptions."""
+    cur.execute("CREATE INDEX ItemLocationsItemIDIndex ON ItemLocations(ItemID)")
+    cur.execute("CREATE INDEX ItemLocationsMapIDIndex ON ItemLocations(MapID)")
+
+    cur.execute(
+        """
+        CREATE TABLE MapSummary (
+            MapID             INTEGER NOT NULL UNIQUE,
+            PlanetID          INTEGER NOT NULL,
+            NumItems          INTEGER NOT NULL,
+            NumItemsCollected INTEGER NOT NULL,
+            TotalPoints       INTEGER NOT NULL,
+            CollectedPoints   INTEGER NOT NULL,
+            PRIMARY KEY(MapID),
+            FOREIGN KEY(MapID) REFERENCES Maps(ID),
+            FOREIGN KEY(PlanetID) REFERENCES Planets(ID)
+        )
+        """,
+    )
+    cur.execute(
+        """
+        INSERT INTO
+            MapSummary (
+                MapID, PlanetID, NumItems, NumItemsCollected, TotalPoints, CollectedPoints
+            )
+        SELECT
+            l.MapID,
+            l.PlanetID,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE s.NumCollected > 0),
+            SUM(i.Points),
+            IFNULL(SUM(i.Points) FILTER (WHERE s.NumCollected > 0), 0)
+        FROM
+            ItemLocations as l
+        INNER JOIN
+            Items as i ON l.ItemID = i.ID
+        INNER JOIN
+            ItemStats as s ON l.ItemID = s.ItemID
+        GROUP BY
+            l.MapID
+        """,
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE PlanetSummary (
+            PlanetID          INTEGER NOT NULL UNIQUE,
+            NumItems          INTEGER NOT NULL,
+            NumItemsCollected INTEGER NOT NULL,
+            TotalPoints       INTEGER NOT NULL,
+            CollectedPoints   INTEGER NOT NULL,
+            PRIMARY KEY(PlanetID),
+            FOREIGN KEY(PlanetID) REFERENCES Planets(ID)
+        )
+        """,
+    )
+    cur.execute(
+        """
+        INSERT INTO
+            PlanetSummary (PlanetID, NumItems, NumItemsCollected, TotalPoints, CollectedPoints)
+        SELECT
+            l.PlanetID,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE s.NumCollected > 0),
+            SUM(i.Points),
+            IFNULL(SUM(i.Points) FILTER (WHERE s.NumCollected > 0), 0)
+        FROM
+            (SELECT DISTINCT PlanetID, ItemID FROM ItemLocations) as l
+        INNER JOIN
+            Items as i ON l.ItemID = i.ID
+        INNER JOIN
+            ItemStats as s ON l.ItemID = s.ItemID
+        GROUP BY
+            l.PlanetID
+        """,
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER ItemStatsUpdateSummaries AFTER UPDATE OF NumCollected ON ItemStats
+        WHEN (OLD.NumCollected > 0) != (NEW.NumCollected > 0)
+        BEGIN
+            UPDATE
+                MapSummary
+            SET
+                NumItemsCollected = NumItemsCollected + IIF(NEW.NumCollected > 0, 1, -1),
+                CollectedPoints = CollectedPoints + IIF(NEW.NumCollected > 0, 1, -1) * (
+                    SELECT Points FROM Items WHERE ID = NEW.ItemID
+                )
+            WHERE
+                MapID IN (SELECT MapID FROM ItemLocations WHERE ItemID = NEW.ItemID);
+
+            UPDATE
+                PlanetSummary
+            SET
+                NumItemsCollected = NumItemsCollected + IIF(NEW.NumCollected > 0, 1, -1),
+                CollectedPoints = CollectedPoints + IIF(NEW.NumCollected > 0, 1, -1) * (
+                    SELECT Points FROM Items WHERE ID = NEW.ItemID
+                )
+            WHERE
+                PlanetID IN (SELECT PlanetID FROM ItemLocations WHERE ItemID = NEW.ItemID);
+        END
+        """,
+    )
+
+
+def item_search_sources(description: str) -> str:
+    """
+    Extracts the list of sources from an item's description, for use in the search index.
+
+    Args:
+        description: The item's full description.
+    Returns:
+        All the item's sources, one per line.
+    """
+    _, _, sources = description.partition("<ul>")
+    return re.sub(r"<[^>]*>", "", sources.replace("</li>", "\n")).strip()
+
+
+@migration(3)
+def add_item_search(cur: sqlite3.Cursor) -> None:
+    """Adds a full text search index over item names and sources."""
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE ItemSearch USING fts5(
+                Name,
+                Sources,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """,
+        )
+    except sqlite3.OperationalError:
+        # Searching falls back to a plain `LIKE` if the table doesn't exist
+        logging.warning("[HUNT] SQLite was compiled without FTS5, searching items will be slower")
+        return
+
+    cur.execute("SELECT ID, Name, Description FROM Items")
+    cur.executemany(
+        "INSERT INTO ItemSearch (rowid, Name, Sources) VALUES (?, ?, ?)",
+        [
+            (item_id, name, item_search_sources(description))
+            for item_id, name, description in cur.fetchall()
+        ],
+    )
+
+
+@migration(4)
+def add_item_list_indexes(cur: sqlite3.Cursor) -> None:
+    """Adds indexes to support the missing only and by points item lists."""
+    cur.execute("CREATE INDEX ItemStatsMissingIndex ON ItemStats(ItemID) WHERE NumCollected = 0")
+    cur.execute("CREATE INDEX ItemsPointsIndex ON Items(Points DESC, Name)")
+
+
+# Deletes and updates are rare, and can change which completion counts as the first, so these just
+# recalculate the whole balance from scratch
+TOKEN_LEDGER_RECALCULATE_EVENTS: tuple[tuple[str, str], ...] = (
+    ("CompletedMissionsDeleteTokenLedger", "DELETE ON CompletedMissions"),
+    ("CompletedMissionsUpdateTokenLedger", "UPDATE OF MissionClass ON CompletedMissions"),
+    ("MissionTokensInsertTokenLedger", "INSERT ON MissionTokens"),
+    ("MissionTokensDeleteTokenLedger", "DELETE ON MissionTokens"),
+    ("MissionTokensUpdateTokenLedger", "UPDATE ON MissionTokens"),
+)
+
+
+@migration(5)
+def add_token_ledger(cur: sqlite3.Cursor) -> None:
+    """Replaces re-aggregating missions in `AvailableTokens` with a trigger-kept balance."""
+    cur.execute(
+        """
+        CREATE INDEX CompletedMissionsMissionClassIndex ON CompletedMissions(MissionClass)
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TABLE TokenLedger (
+            ID     INTEGER NOT NULL UNIQUE CHECK (ID = 1),
+            Tokens INTEGER NOT NULL,
+            PRIMARY KEY(ID)
+        )
+        """,
+    )
+    cur.execute(
+        """
+        INSERT INTO
+            TokenLedger (ID, Tokens)
+        SELECT
+            1, Tokens
+        FROM
+            AvailableTokens
+        """,
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER CompletedMissionsInsertTokenLedger AFTER INSERT ON CompletedMissions
+        BEGIN
+            UPDATE
+                TokenLedger
+            SET
+                Tokens = Tokens + IFNULL(
+                    (
+                        SELECT
+                            IIF(
+                                EXISTS (
+                                    SELECT
+                                        1
+                                    FROM
+                                        CompletedMissions as c
+                                    WHERE
+                                        c.MissionClass = NEW.MissionClass
+                                        and c.ID != NEW.ID
+                                ),
+                                t.SubsequentTokens,
+                                t.InitialTokens
+                            )
+                        FROM
+                            MissionTokens as t
+                        WHERE
+                            t.MissionClass = NEW.MissionClass
+                    ),
+                    0
+                );
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER TokenRedeemsInsertTokenLedger AFTER INSERT ON TokenRedeems
+        BEGIN
+            UPDATE TokenLedger SET Tokens = Tokens - 1;
+        END
+        """,
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER TokenRedeemsDeleteTokenLedger AFTER DELETE ON TokenRedeems
+        BEGIN
+            UPDATE TokenLedger SET Tokens = Tokens + 1;
+        END
+        """,
+    )
+    for name, event in TOKEN_LEDGER_RECALCULATE_EVENTS:
+        cur.execute(
+            f"""
+            CREATE TRIGGER {name} AFTER {event}
+            BEGIN
+                UPDATE
+                    TokenLedger
+                SET
+                    Tokens = (
+                        SELECT
+                            IFNULL(SUM(Tokens), 0)
+                            + 1
+                            - IFNULL((SELECT COUNT(*) FROM TokenRedeems), 0)
+                        FROM
+                        (
+                            SELECT
+                                CASE COUNT(*)
+                                    WHEN 0 THEN 0
+                                    WHEN 1 THEN t.InitialTokens
+                                    ELSE t.InitialTokens + (t.SubsequentTokens * (COUNT(*) - 1))
+                                END as Tokens
+                            FROM
+                                MissionTokens as t
+                            INNER JOIN
+                                CompletedMissions as c ON t.MissionClass = c.MissionClass
+                            GROUP BY
+                                t.ID
+                        )
+                    );
+            END
+            """,  # noqa: S608
+        )
+
+    cur.execute("DROP VIEW AvailableTokens")
+    cur.execute(
+        """
+        CREATE VIEW AvailableTokens AS
+        SELECT
+            Tokens
+        FROM
+            TokenLedger
+        """,
+    )
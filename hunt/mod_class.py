@@ -1,7 +1,7 @@
 import os
 import traceback
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from bl3_mod_menu import DialogBox, DialogBoxChoice
 from mods_base import (
@@ -13,17 +13,39 @@ from mods_base import (
     Mod,
     NestedOption,
     SliderOption,
+    hook,
 )
 
-from .db import open_db, reset_db
-from .db_options import FullItemListOption, MapOption, PlanetOption, create_item_option
+from .db import (
+    batch_writes_option,
+    cached_query,
+    flush_writes,
+    get_read_generation,
+    get_write_generation,
+    queue_write,
+    render_session,
+    reset_db,
+)
+from .db_options import FullItemListOption, MapOption, PlanetOption
+from .drops import flush_drops
 from .native import drops
-from .osd import OUTPUT_TEXT_FILE, TEMPLATE_TEXT_FILE, osd_option, update_osd
+from .osd import (
+    OUTPUT_TEXT_FILE,
+    TEMPLATE_TEXT_FILE,
+    osd_interval_option,
+    osd_option,
+    shutdown_osd_worker,
+    update_osd,
+)
+from .search import search_items_option
 from .tokens import redeem_token_option
+from .worker import CoalescingWorker
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
 
+    from unrealsdk.unreal import BoundFunction, UObject, WrappedStruct
+
 
 def gen_item_options() -> Iterator[BaseOption]:
     """
@@ -32,24 +54,23 @@ def gen_item_options() -> Iterator[BaseOption]:
     Yields:
         The child options.
     """
-    with open_db("r") as cur:
-        cur.execute(
-            """
-            SELECT
-                PlanetID, PlanetName, MapID, MapName
-            FROM
-                OptionsList
-            ORDER BY
-                ID
-            """,
-        )
-        for planet_id, planet_name, map_id, map_name in cur.fetchall():
-            if planet_id is None:
-                assert map_id is not None and map_name is not None
-                yield MapOption(map_name, map_id=map_id)
-            else:
-                assert planet_id is not None and planet_name is not None
-                yield PlanetOption(planet_name, planet_id=planet_id)
+    rows = cached_query(
+        """
+        SELECT
+            PlanetID, PlanetName, MapID, MapName
+        FROM
+            OptionsList
+        ORDER BY
+            ID
+        """,
+    )
+    for planet_id, planet_name, map_id, map_name in rows:
+        if planet_id is None:
+            assert map_id is not None and map_name is not None
+            yield MapOption(map_name, map_id=map_id)
+        else:
+            assert planet_id is not None and planet_name is not None
+            yield PlanetOption(planet_name, planet_id=planet_id)
 
 
 yes_choice = DialogBoxChoice("Yes")
@@ -65,9 +86,8 @@ def confirm_mark(choice: DialogBoxChoice) -> None:
     """Dialog box to confirm setting a mark."""
     if choice != yes_choice:
         return
-    with open_db("w") as cur:
-        cur.execute("INSERT INTO StatMarks DEFAULT VALUES")
-    update_osd()
+    # Writing updates the OSD once it's committed
+    queue_write("INSERT INTO StatMarks DEFAULT VALUES")
 
 
 def gen_progression_options() -> Iterator[BaseOption]:
@@ -77,38 +97,37 @@ def gen_progression_options() -> Iterator[BaseOption]:
     Yields:
         The child options.
     """
-    with open_db("r") as cur:
-        cur.execute(
-            """
+    rows = cached_query(
+        """
+        SELECT
+            format("Items: %d/%d", CollectedCount, TotalCount),
+            100.0 * CollectedCount / TotalCount,
+            format("Points: %d/%d", CollectedPoints, TotalPoints),
+            100.0 * CollectedPoints / TotalPoints
+        FROM (
             SELECT
-                format("Items: %d/%d", CollectedCount, TotalCount),
-                100.0 * CollectedCount / TotalCount,
-                format("Points: %d/%d", CollectedPoints, TotalPoints),
-                100.0 * CollectedPoints / TotalPoints
-            FROM (
-                SELECT
-                    COUNT(*) FILTER (WHERE NumCollected > 0) as CollectedCount,
-                    COUNT(*) as TotalCount,
-                    IFNULL(SUM(Points) FILTER (WHERE NumCollected > 0), 0) as CollectedPoints,
-                    SUM(Points) as TotalPoints
-                FROM
-                    CollectedItems
-            )
-            """,
+                COUNT(*) FILTER (WHERE NumCollected > 0) as CollectedCount,
+                COUNT(*) as TotalCount,
+                IFNULL(SUM(Points) FILTER (WHERE NumCollected > 0), 0) as CollectedPoints,
+                SUM(Points) as TotalPoints
+            FROM
+                CollectedItems
+        )
+        """,
+    )
+    item_name, item_percent, points_name, points_percent = rows[0]
+
+    for name, percent in ((item_name, item_percent), (points_name, points_percent)):
+        yield SliderOption(
+            name,
+            percent,
+            min_value=0,
+            max_value=100,
+            description=(
+                "The slider shows your percentage of completion. Somehow, changing it to 100%"
+                " doesn't actually finish the challenge for you."
+            ),
         )
-        item_name, item_percent, points_name, points_percent = cur.fetchone()
-
-        for name, percent in ((item_name, item_percent), (points_name, points_percent)):
-            yield SliderOption(
-                name,
-                percent,
-                min_value=0,
-                max_value=100,
-                description=(
-                    "The slider shows your percentage of completion. Somehow, changing it to 100%"
-                    " doesn't actually finish the challenge for you."
-                ),
-            )
 
 
 def gen_token_options() -> Iterator[BaseOption]:
@@ -118,29 +137,27 @@ def gen_token_options() -> Iterator[BaseOption]:
     Yields:
         The child options.
     """
-    with open_db("r") as cur:
-        cur.execute("SELECT format('Available Tokens: %d', Tokens) FROM AvailableTokens")
-        title = cur.fetchone()[0]
-        yield ButtonOption(
-            title,
-            description=(
-                "On the item inspection screen, you can spend World Drop Tokens to redeem items"
-                " which you got as a world drop (or from any other source not normally allowed).\n"
-                "\n"
-                "You initially have one world drop token, and can earn more by completing the main"
-                " campaign missions. Subsequent completions are worth more.\n"
-                "<font color='#FFFFFF'><b>Mission\t\t\t\t\t\t\tFirst\t\tSubsequent</b></font>\n"
-                "<font color='#B0E0F0'>"
-                "Divine Retribution\t\t\t\t\t2\t\t20\n"
-                "All Bets Off\t\t\t\t\t\t1\t\t7\n"
-                "The Call of Gythian\t\t\t\t\t1\t\t7\n"
-                "Riding to Ruin\t\t\t\t\t\t1\t\t5\n"
-                "Locus of Rage\t\t\t\t\t\t1\t\t5\n"
-                "Mysteriouslier: Horror at Scryer's Crypt\t1\t\t3\n"
-                "</font>"
-            ),
-        )
-        yield redeem_token_option
+    ((title,),) = cached_query("SELECT format('Available Tokens: %d', Tokens) FROM AvailableTokens")
+    yield ButtonOption(
+        title,
+        description=(
+            "On the item inspection screen, you can spend World Drop Tokens to redeem items"
+            " which you got as a world drop (or from any other source not normally allowed).\n"
+            "\n"
+            "You initially have one world drop token, and can earn more by completing the main"
+            " campaign missions. Subsequent completions are worth more.\n"
+            "<font color='#FFFFFF'><b>Mission\t\t\t\t\t\t\tFirst\t\tSubsequent</b></font>\n"
+            "<font color='#B0E0F0'>"
+            "Divine Retribution\t\t\t\t\t2\t\t20\n"
+            "All Bets Off\t\t\t\t\t\t1\t\t7\n"
+            "The Call of Gythian\t\t\t\t\t1\t\t7\n"
+            "Riding to Ruin\t\t\t\t\t\t1\t\t5\n"
+            "Locus of Rage\t\t\t\t\t\t1\t\t5\n"
+            "Mysteriouslier: Horror at Scryer's Crypt\t1\t\t3\n"
+            "</font>"
+        ),
+    )
+    yield redeem_token_option
 
 
 reset_playthrough_choice = DialogBoxChoice("Reset Playthrough")
@@ -217,6 +234,8 @@ def coop_enabled_option(_: BoolOption, enabled: bool) -> None:  # noqa: D103
 
 coop_options = GroupedOption("Coop", (coop_enabled_option, beam_blink_duration_option))
 
+database_options = GroupedOption("Database", (batch_writes_option,))
+
 
 def gen_extra_options() -> Iterator[BaseOption]:
     """
@@ -236,6 +255,7 @@ def gen_extra_options() -> Iterator[BaseOption]:
     )
     yield reset_playthrough_button
     yield coop_options
+    yield database_options
 
     yield GroupedOption(
         "On Screen Display",
@@ -276,6 +296,7 @@ def gen_extra_options() -> Iterator[BaseOption]:
                 ),
             ),
             osd_option,
+            osd_interval_option,
         ),
         description=(
             "Settings to help display these, and various other interesting stats, on screen.\n"
@@ -286,6 +307,172 @@ def gen_extra_options() -> Iterator[BaseOption]:
     )
 
 
+def gen_display_options(world: str) -> Iterator[BaseOption]:
+    """
+    Generates all the options shown in the mod's menu.
+
+    Args:
+        world: The name of the current world.
+    Yields:
+        The child options.
+    """
+    yield NestedOption("Extras", tuple(gen_extra_options()))
+
+    yield GroupedOption("Progression", tuple(gen_progression_options()))
+    yield GroupedOption("World Drop Tokens", tuple(gen_token_options()))
+
+    # See if we can add the current world
+    rows = cached_query(
+        """
+        SELECT
+            MapID, MapName
+        FROM
+            ItemLocations
+        WHERE
+            WorldName = ?
+        LIMIT 1
+        """,
+        (world,),
+    )
+    for map_id, map_name in rows:
+        yield GroupedOption("Current Map", (MapOption(map_name, map_id=map_id),))
+
+    yield GroupedOption("Items", tuple(gen_item_options()))
+    yield GroupedOption(
+        "Full Item List",
+        (
+            search_items_option,
+            FullItemListOption(
+                "Full Item List",
+                description="Every item in the hunt, sorted alphabetically.",
+            ),
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class OptionsSnapshot:
+    """
+    A prebuilt copy of the mod's menu.
+
+    Args:
+        generation: The db write generation the options were built from.
+        world: The world the options were built for.
+        options: The options.
+    """
+
+    generation: int
+    world: str
+    options: tuple[BaseOption, ...]
+
+
+# Building all the options takes a few dozen queries, which we'd rather not run on the game thread
+# when the menu's opened. Instead, we build them in the background after something changes, and
+# simply swap in the new snapshot when done. Bursts of changes, such as several drops in a row, are
+# combined into a single rebuild.
+#
+# The worker only ever creates new options, it never touches ones which have already been shown -
+# the search option in particular is shared, so it only gets refreshed on the game thread. Each
+# snapshot is fully built before it's published, and swapping it in is just a single assignment.
+OPTIONS_REBUILD_INTERVAL: float = 1.0
+
+_options_snapshot: OptionsSnapshot | None = None
+_options_world: str | None = None
+
+
+def _prebuild_option(option: BaseOption) -> None:
+    """
+    Forces any lazily generated fields on an option, and all it's children, to be generated now.
+
+    Leaves the item lists inside maps lazy, since these are only generated when opened.
+
+    Args:
+        option: The option to prebuild.
+    """
+    if isinstance(option, (MapOption, PlanetOption)):
+        _ = option.description
+    if isinstance(option, (GroupedOption, PlanetOption)):
+        for child in option.children:
+            _prebuild_option(child)
+
+
+def _build_options_snapshot(world: str, *, prebuild: bool) -> OptionsSnapshot:
+    """
+    Builds a new snapshot of the mod's menu.
+
+    Args:
+        world: The name of the current world.
+        prebuild: If true, also generates all lazy descriptions up front.
+    Returns:
+        The new snapshot.
+    """
+    # Build everything from a single snapshot of the db, and tag it with that snapshot's generation,
+    # so if there's a write while we're building, it's already stale
+    with render_session():
+        generation = get_read_generation()
+        options = tuple(gen_display_options(world))
+        if prebuild:
+            for option in options:
+                _prebuild_option(option)
+    return OptionsSnapshot(generation, world, options)
+
+
+def _rebuild_options() -> None:
+    global _options_snapshot
+
+    world = _options_world
+    if world is None:
+        return
+
+    snapshot = _options_snapshot
+    if (
+        snapshot is not None
+        and snapshot.generation == get_write_generation()
+        and snapshot.world == world
+    ):
+        return
+
+    new_snapshot = _build_options_snapshot(world, prebuild=True)
+    # If the game thread had to build one itself in the meantime, it's at least as new as ours
+    if _options_snapshot is snapshot:
+        _options_snapshot = new_snapshot
+
+
+_options_worker = CoalescingWorker(
+    "hunt options",
+    _rebuild_options,
+    lambda: OPTIONS_REBUILD_INTERVAL,
+)
+
+
+def request_options_rebuild(world: str | None = None) -> None:
+    """
+    Requests that the options snapshot be rebuilt in the background.
+
+    Args:
+        world: If not None, the name of the new current world.
+    """
+    global _options_world
+    if world is not None:
+        _options_world = world
+    _options_worker.request()
+
+
+def shutdown_options_worker() -> None:
+    """Stops the options rebuild thread."""
+    _options_worker.shutdown()
+
+
+@hook("/Script/Engine.PlayerController:ServerNotifyLoadedWorld")
+def world_loaded_hook(  # noqa: D103
+    _1: UObject,
+    _2: WrappedStruct,
+    _3: Any,
+    _4: BoundFunction,
+) -> None:
+    request_options_rebuild(ENGINE.GameViewport.World.Name)
+
+
 @dataclass
 class HuntTracker(Mod):
     def __post_init__(self) -> None:
@@ -299,51 +486,39 @@ class HuntTracker(Mod):
 
     def disable(self, dont_update_setting: bool = False) -> None:  # noqa: D102
         super().disable(dont_update_setting)
+        flush_drops()
+        flush_writes()
         update_osd()
+        shutdown_osd_worker()
+        shutdown_options_worker()
         drops.disable()
 
     def iter_display_options(self) -> Iterator[BaseOption]:  # noqa: D102
-        try:
-            create_item_option.cache_clear()
+        global _options_snapshot
 
-            yield NestedOption("Extras", tuple(gen_extra_options()))
-
-            yield GroupedOption("Progression", tuple(gen_progression_options()))
-            yield GroupedOption("World Drop Tokens", tuple(gen_token_options()))
-
-            # See if we can add the current world
+        try:
             world: str = ENGINE.GameViewport.World.Name
-            with open_db("r") as cur:
-                cur.execute(
-                    """
-                    SELECT
-                        MapID, MapName
-                    FROM
-                        ItemLocations
-                    WHERE
-                        WorldName = ?
-                    LIMIT 1
-                    """,
-                    (world,),
-                )
-                row = cur.fetchone()
-                if row is not None:
-                    map_id, map_name = row
-                    yield GroupedOption("Current Map", (MapOption(map_name, map_id=map_id),))
-
-            yield GroupedOption("Items", tuple(gen_item_options()))
-            yield GroupedOption(
-                "Full Item List",
-                (
-                    FullItemListOption(
-                        "Full Item List",
-                        description=(
-                            "Note that selecting this option may cause the game to freeze for"
-                            "several seconds while the entire list is generated."
-                        ),
-                    ),
-                ),
-            )
+
+            # Always rebuild the search results, since they might've been collected since
+            search_items_option.refresh()
+
+            snapshot = _options_snapshot
+            if (
+                snapshot is None
+                or snapshot.generation != get_write_generation()
+                or snapshot.world != world
+            ):
+                # The background build isn't ready yet, get the next one started in case we missed
+                # the change, but build this one ourselves. Leave descriptions lazy, since only a
+                # few of them are going to get shown.
+                request_options_rebuild(world)
+                old_snapshot = snapshot
+                snapshot = _build_options_snapshot(world, prebuild=False)
+                # Keep it around, unless the worker managed to swap in a newer one in the meantime
+                if _options_snapshot is old_snapshot:
+                    _options_snapshot = snapshot
+
+            yield from snapshot.options
 
         except Exception:  # noqa: BLE001
             yield ButtonOption(
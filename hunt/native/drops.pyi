@@ -1,9 +1,20 @@
 from collections.abc import Callable
+from typing import TypedDict
 
 from unrealsdk.unreal import UObject
 
 InventoryBalanceStateComponent = UObject
 
+class TimerStats(TypedDict):
+    count: int
+    total_ns: int
+    max_ns: int
+    buckets: list[int]
+
+class DropStats(TypedDict):
+    counters: dict[str, int]
+    timers: dict[str, TimerStats]
+
 def set_db_getter(getter: Callable[[], str]) -> Callable[[], str]:
     """
     Sets the function used to get the db path.
@@ -57,6 +68,24 @@ def get_inventory_balance_name(bal_comp: InventoryBalanceStateComponent) -> str:
         The inventory balance's name.
     """
 
+def get_stats() -> DropStats:
+    """
+    Gets the drop detection hooks' stats.
+
+    Counters are simple call/outcome counts. Timers record how long each hook, or
+    part of one, took. Timer histogram bucket `i` counts durations with a bit
+    width of `i` in microseconds, i.e. bucket 0 is under 1us, bucket 1 [1us, 2us),
+    bucket 2 [2us, 4us), etc., with the last bucket holding everything longer.
+
+    Returns:
+        A dict with two keys: 'counters', mapping counter names to their counts,
+        and 'timers', mapping timer names to dicts of their 'count', 'total_ns',
+        'max_ns', and histogram 'buckets'.
+    """
+
+def reset_stats() -> None:
+    """Resets all the drop detection hooks' stats back to zero."""
+
 def enable() -> None:
     """Enables the drop detection hooks."""
 
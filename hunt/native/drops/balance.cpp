@@ -21,6 +21,13 @@ dedicated source, or if you just try redeem a world drop token, we won't match t
 count the item - which looks identical to one which would work.
 
 To fix this, we look through the parts on the item, and map it back to the dedicated balance.
+
+Getting an object's path name builds a new string every time, and we look up the same handful of
+balances over and over again, so we also cache the names of all the normal balances, keyed on their
+pointer. Since balances could theoretically get unloaded, and another object take the same address,
+we clear this on every world change, and keep it bounded. The names are interned as shared pointers,
+so looking one up never copies the string, and it stays valid for the caller even if the cache gets
+cleared in the meantime.
 */
 
 using namespace unrealsdk::unreal;
@@ -30,8 +37,10 @@ namespace {
 using InventoryBalanceData = UObject;
 using InventoryPartData = UObject;
 
+using BalanceName = std::shared_ptr<const std::wstring>;
+
 using ExpandableBalanceDataMap =
-    std::unordered_map<InventoryBalanceData*, std::unordered_map<InventoryPartData*, std::wstring>>;
+    std::unordered_map<InventoryBalanceData*, std::unordered_map<InventoryPartData*, BalanceName>>;
 
 ExpandableBalanceDataMap load_expandable_balance_data(void) {
     static const constinit std::string_view load_query =
@@ -78,18 +87,24 @@ ExpandableBalanceDataMap load_expandable_balance_data(void) {
             unrealsdk::find_object(L"InventoryBalanceData"_fn, {root_bal_ptr, root_bal_size});
         auto part_obj = unrealsdk::find_object(L"InventoryPartData"_fn, {part_ptr, part_size});
 
-        output[root_obj].emplace(std::piecewise_construct, std::forward_as_tuple(part_obj),
-                                 std::forward_as_tuple(expanded_bal_ptr, expanded_bal_size));
+        output[root_obj].emplace(
+            part_obj, std::make_shared<const std::wstring>(expanded_bal_ptr, expanded_bal_size));
     }
 
     return output;
 }
 
+const constexpr size_t MAX_CACHED_BALANCE_NAMES = 1024;
+
+// Only ever accessed from the game thread
+std::unordered_map<InventoryBalanceData*, BalanceName> balance_name_cache{};
+
 }  // namespace
 
 namespace hunt::balance {
 
-std::wstring get_inventory_balance_name(InventoryBalanceStateComponent* bal_comp) {
+std::shared_ptr<const std::wstring> get_inventory_balance_name(
+    InventoryBalanceStateComponent* bal_comp) {
     static const ExpandableBalanceDataMap expandable_balance_data = load_expandable_balance_data();
 
     static auto inv_bal_prop =
@@ -112,7 +127,21 @@ std::wstring get_inventory_balance_name(InventoryBalanceStateComponent* bal_comp
         }
     }
 
-    return bal_obj->get_path_name();
+    auto iter = balance_name_cache.find(bal_obj);
+    if (iter != balance_name_cache.end()) {
+        return iter->second;
+    }
+
+    if (balance_name_cache.size() >= MAX_CACHED_BALANCE_NAMES) {
+        balance_name_cache.clear();
+    }
+    return balance_name_cache
+        .emplace(bal_obj, std::make_shared<const std::wstring>(bal_obj->get_path_name()))
+        .first->second;
+}
+
+void clear_balance_name_cache(void) {
+    balance_name_cache.clear();
 }
 
 }  // namespace hunt::balance
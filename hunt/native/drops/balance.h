@@ -13,11 +13,18 @@ using InventoryBalanceStateComponent = unrealsdk::unreal::UObject;
 
 /**
  * @brief Gets the name of this item's inventory balance.
+ * @note The name is shared with the cache, but stays valid even after it gets cleared.
  *
  * @param bal_comp The InventoryBalanceStateComponent to inspect.
  * @return The inventory balance's name.
  */
-std::wstring get_inventory_balance_name(InventoryBalanceStateComponent* bal_comp);
+std::shared_ptr<const std::wstring> get_inventory_balance_name(
+    InventoryBalanceStateComponent* bal_comp);
+
+/**
+ * @brief Clears the cached balance names, on world change.
+ */
+void clear_balance_name_cache(void);
 
 }  // namespace hunt::balance
 
@@ -11,6 +11,7 @@
 #include <mutex>
 #include "coop.h"
 #include "hooks.h"
+#include "stats.h"
 
 using namespace unrealsdk::unreal;
 
@@ -59,22 +60,57 @@ const constexpr auto REQUIRED_BLINK_THRESHOLD = 5;
 
 uint32_t total_blink_count = 20;  // NOLINT(readability-magic-numbers)
 
+/*
+Rather than polling everything every interval, the blinky thread keeps min-heaps of when each entry
+is next due, and sleeps exactly until the earliest one. The hooks never touch the heaps directly,
+they just append to a pending list, so that they only ever hold the mutex for a constant amount of
+time.
+
+The thread only holds the mutex itself while swapping those lists out, and while removing each timed
+out client entry - never while blinking, since that calls back into the engine - so the hooks never
+have to wait behind a whole update.
+*/
+
+using Clock = std::chrono::steady_clock;
+
 struct HostUpcomingBlink {
+    Clock::time_point deadline;
     // Need to use weak pointers since we dereference this, and the object might get picked up and
     // destroyed between updates
     WeakPointer obj;
     uint32_t remaining_blinks;
 };
-std::vector<HostUpcomingBlink> host_upcoming_blinks{};
 
 struct ClientSeenBlink {
     uint32_t seen_blinks{};
-    std::chrono::steady_clock::time_point timeout;
+    Clock::time_point timeout;
 };
 // It's safe to use a raw pointer here since we never dereference it, we only check if the pointer
 // we get from a hook (which we know is valid) is contained within it.
 std::unordered_map<UObject*, ClientSeenBlink> client_seen_blinks{};
 
+struct ClientTimeout {
+    Clock::time_point deadline;
+    UObject* obj;
+};
+
+template <typename T>
+struct LaterDeadline {
+    bool operator()(const T& lhs, const T& rhs) const { return lhs.deadline > rhs.deadline; }
+};
+template <typename T>
+using DeadlineHeap = std::priority_queue<T, std::vector<T>, LaterDeadline<T>>;
+
+// Added to by the hooks, swapped out and merged into the heaps by the blinky thread
+std::vector<HostUpcomingBlink> pending_host_blinks{};
+std::vector<ClientTimeout> pending_client_timeouts{};
+// Set on world change, to get the blinky thread to throw away everything it's got scheduled
+bool reset_blinky_heaps = false;
+
+// Only ever used by the blinky thread
+DeadlineHeap<HostUpcomingBlink> host_upcoming_blinks{};
+DeadlineHeap<ClientTimeout> client_timeouts{};
+
 std::mutex blinky_mutex{};
 std::condition_variable wake_blinky_thread{};
 
@@ -83,79 +119,141 @@ std::condition_variable wake_blinky_thread{};
 std::atomic<bool> stop_blinky = false;
 
 /**
- * @brief Checks if the blinky thread needs to be actively running.
+ * @brief Checks if the blinky thread has anything new to handle.
  *
- * @return True if it needs to be running.
+ * @return True if it should wake up.
  */
-bool need_blinky_thread_running(void) {
-    return !host_upcoming_blinks.empty() || !client_seen_blinks.empty() || stop_blinky;
+bool blinky_thread_has_work(void) {
+    return !pending_host_blinks.empty() || !pending_client_timeouts.empty() || reset_blinky_heaps
+           || stop_blinky;
 };
 
+/**
+ * @brief Gets when the blinky thread next needs to wake up.
+ *
+ * @return The earliest deadline in either heap, or nullopt if they're both empty.
+ */
+std::optional<Clock::time_point> next_blinky_deadline(void) {
+    std::optional<Clock::time_point> deadline{};
+    if (!host_upcoming_blinks.empty()) {
+        deadline = host_upcoming_blinks.top().deadline;
+    }
+    if (!client_timeouts.empty()
+        && (!deadline.has_value() || client_timeouts.top().deadline < *deadline)) {
+        deadline = client_timeouts.top().deadline;
+    }
+    return deadline;
+}
+
+/**
+ * @brief Blinks a pickup on the host.
+ *
+ * @param entry The blink entry to update.
+ * @return True if the entry needs to be blinked again, false if it's done.
+ */
+bool update_host_blink(HostUpcomingBlink& entry) {
+    // Drop anything where the pointer's been invalidated
+    auto obj = *entry.obj;
+    if (obj == nullptr) {
+        return false;
+    }
+
+    static auto set_no_loot_beam_func = obj->Class()->find_func_and_validate(L"SetNoLootBeam"_fn);
+    static auto no_loot_beam_prop =
+        obj->Class()->find_prop_and_validate<ZBoolProperty>(L"bNoLootBeam"_fn);
+
+    // Drop anything which's used all blinks
+    if (entry.remaining_blinks == 0) {
+        // Make sure the beam's definitely on now
+        BoundFunction{.func = set_no_loot_beam_func, .object = obj}.call<void, ZBoolProperty>(
+            false);
+        return false;
+    }
+    entry.remaining_blinks--;
+    stats::increment(stats::Counter::BLINKY_BLINKS);
+
+    // Toggle the beam, and keep this entry
+    BoundFunction{.func = set_no_loot_beam_func, .object = obj}.call<void, ZBoolProperty>(
+        !obj->get<ZBoolProperty>(no_loot_beam_prop));
+    return true;
+}
+
 void blinky_thread(void) {
     SetThreadDescription(GetCurrentThread(), L"hunt tracker blinky");
 
+    // Swapped with the pending lists each update, so we keep re-using the same two buffers
+    std::vector<HostUpcomingBlink> new_host_blinks{};
+    std::vector<ClientTimeout> new_client_timeouts{};
+
+    std::unique_lock<std::mutex> lock(blinky_mutex);
     while (true) {
-        // Deep sleep while there's nothing in the list
-        std::unique_lock<std::mutex> lock(blinky_mutex);
-        if (!need_blinky_thread_running()) {
-            wake_blinky_thread.wait(lock, &need_blinky_thread_running);
+        auto deadline = next_blinky_deadline();
+        if (deadline.has_value()) {
+            wake_blinky_thread.wait_until(lock, *deadline, &blinky_thread_has_work);
+        } else {
+            // Deep sleep while there's nothing scheduled
+            wake_blinky_thread.wait(lock, &blinky_thread_has_work);
         }
+
         if (stop_blinky) {
             stop_blinky = false;
             return;
         }
 
-        // "Polling" loop until we're allowed to sleep again
-        while (need_blinky_thread_running()) {
-            // Slight abuse of std::erase_if: since it must visit every element, we use it to blink
-            // all valid ones at the same time as we remove all invalid ones
-            std::erase_if(
-                host_upcoming_blinks, [](decltype(host_upcoming_blinks)::value_type& entry) {
-                    // Remove anything where the pointer's been invalidated
-                    auto obj = *entry.obj;
-                    if (obj == nullptr) {
-                        return true;
-                    }
-
-                    static auto set_no_loot_beam_func =
-                        obj->Class()->find_func_and_validate(L"SetNoLootBeam"_fn);
-                    static auto no_loot_beam_prop =
-                        obj->Class()->find_prop_and_validate<ZBoolProperty>(L"bNoLootBeam"_fn);
-
-                    // Remove anything which's used all blinks
-                    if (entry.remaining_blinks == 0) {
-                        // Make sure the beam's definitely on now
-                        BoundFunction{.func = set_no_loot_beam_func, .object = obj}
-                            .call<void, ZBoolProperty>(false);
-                        return true;
-                    }
-                    entry.remaining_blinks--;
-
-                    // Toggle the beam, and keep this entry
-                    BoundFunction{.func = set_no_loot_beam_func, .object = obj}
-                        .call<void, ZBoolProperty>(!obj->get<ZBoolProperty>(no_loot_beam_prop));
-                    return false;
-                });
-
-            // From the client map, all we do is remove entries which have timed out.
-            auto now = std::chrono::steady_clock::now();
-            std::erase_if(client_seen_blinks,
-                          [now](decltype(client_seen_blinks)::value_type& entry) {
-                              return entry.second.timeout < now;
-                          });
-
-            if (need_blinky_thread_running()) {
-                // Sleep one interval, until we next need to blink again
-                lock.unlock();
-                std::this_thread::sleep_for(BLINK_INTERVAL);
-                lock.lock();
+        const bool reset = reset_blinky_heaps;
+        reset_blinky_heaps = false;
+        new_host_blinks.swap(pending_host_blinks);
+        new_client_timeouts.swap(pending_client_timeouts);
+        lock.unlock();
+
+        const auto update_start = Clock::now();
+        stats::increment(stats::Counter::BLINKY_UPDATES);
+
+        if (reset) {
+            host_upcoming_blinks = {};
+            client_timeouts = {};
+        }
+        for (auto& entry : new_host_blinks) {
+            host_upcoming_blinks.push(std::move(entry));
+        }
+        new_host_blinks.clear();
+        for (const auto& entry : new_client_timeouts) {
+            client_timeouts.push(entry);
+        }
+        new_client_timeouts.clear();
+
+        auto now = Clock::now();
+
+        while (!host_upcoming_blinks.empty() && host_upcoming_blinks.top().deadline <= now) {
+            auto entry = host_upcoming_blinks.top();
+            host_upcoming_blinks.pop();
+
+            if (update_host_blink(entry)) {
+                // Schedule off of now rather than the old deadline, so if we fell behind, we don't
+                // toggle it twice in the same tick (which wouldn't get sent to clients)
+                entry.deadline = now + BLINK_INTERVAL;
+                host_upcoming_blinks.push(std::move(entry));
             }
+        }
 
-            if (stop_blinky) {
-                stop_blinky = false;
-                return;
+        // From the client side, all we do is remove entries which have timed out
+        while (!client_timeouts.empty() && client_timeouts.top().deadline <= now) {
+            auto obj = client_timeouts.top().obj;
+            client_timeouts.pop();
+
+            // The entry may have already been removed (or even replaced by a new object at the
+            // same address), so make sure it's actually timed out
+            const std::scoped_lock seen_lock(blinky_mutex);
+            auto iter = client_seen_blinks.find(obj);
+            if (iter != client_seen_blinks.end() && iter->second.timeout <= now) {
+                client_seen_blinks.erase(iter);
             }
         }
+
+        stats::record(stats::Timer::BLINKY_UPDATE, Clock::now() - update_start);
+
+        // Need to hold the lock again before checking for more work
+        lock.lock();
     }
 }
 
@@ -163,11 +261,14 @@ const constexpr std::wstring_view CLIENT_CONSTRUCT_HOOK_FUNC_NAME =
     L"/Script/GbxInventory.InventoryItemPickup:OnRep_PickupActorClientSpawnData";
 
 bool client_construct_hook(unrealsdk::hook_manager::Details& details) {
-    const std::scoped_lock lock(blinky_mutex);
-    client_seen_blinks.emplace(
-        std::piecewise_construct, std::forward_as_tuple(details.obj),
-        std::forward_as_tuple(
-            0, std::chrono::steady_clock::now() + (BLINK_INTERVAL * total_blink_count)));
+    auto timeout = Clock::now() + (BLINK_INTERVAL * total_blink_count);
+    {
+        const std::scoped_lock lock(blinky_mutex);
+        client_seen_blinks.emplace(std::piecewise_construct, std::forward_as_tuple(details.obj),
+                                   std::forward_as_tuple(0, timeout));
+        pending_client_timeouts.emplace_back(timeout, details.obj);
+    }
+    wake_blinky_thread.notify_all();
     return false;
 }
 
@@ -200,15 +301,20 @@ void transmit_valid_pickup_to_clients(UObject* pickup) {
 
     {
         const std::scoped_lock lock(blinky_mutex);
-        host_upcoming_blinks.emplace_back(pickup, total_blink_count);
+        pending_host_blinks.emplace_back(Clock::now(), pickup, total_blink_count);
     }
     wake_blinky_thread.notify_all();
 }
 
 void reset_state_on_world_change(void) {
-    const std::scoped_lock lock(blinky_mutex);
-    host_upcoming_blinks.clear();
-    client_seen_blinks.clear();
+    {
+        const std::scoped_lock lock(blinky_mutex);
+        pending_host_blinks.clear();
+        pending_client_timeouts.clear();
+        client_seen_blinks.clear();
+        reset_blinky_heaps = true;
+    }
+    wake_blinky_thread.notify_all();
 }
 
 void enable(void) {
@@ -3,128 +3,235 @@
 #include "drop_queries.h"
 #include "sql.h"
 
+/*
+The drop hook runs on every single pickup which gets spawned, so rather than querying the db each
+time, we load the relevant parts of the `Items` and `Drops` tables into memory once, and do all
+lookups against that.
+
+These tables are static - they never get written to, and a reset just swaps in another copy of the
+same template - so we load them once when the hooks are enabled, and keep them around even when the
+db gets closed.
+
+The db compares all these columns case insensitively. Sqlite's `NOCASE` only folds ASCII, so we
+hash and compare the same way. The containers are transparent, so lookups can use the views we're
+given directly, without copying them.
+*/
+
 namespace {
 
-// This doesn't seem to want to play well with templated string pointers
-// NOLINTBEGIN(cppcoreguidelines-pro-bounds-array-to-pointer-decay)
+/**
+ * @brief Lowercases an ASCII character, matching sqlite's `NOCASE` collation.
+ *
+ * @param chr The character to lowercase.
+ * @return The lowercased character.
+ */
+constexpr wchar_t to_lower_ascii(wchar_t chr) {
+    return (L'A' <= chr && chr <= L'Z') ? static_cast<wchar_t>(chr + (L'a' - L'A')) : chr;
+}
 
 /**
- * @brief Runs a query which takes a single balance name as input, and returns a single bool.
+ * @brief Hashes a string, ignoring ASCII case.
  *
- * @tparam query The query to run.
- * @tparam name The name to give the query in error messages.
- * @param balance_name The name of the balance to check.
- * @return The result of the query
+ * @param str The string to hash.
+ * @return The hash.
  */
-template <const char* query, const char* name>
-bool run_single_bal_bool_query(std::wstring_view balance_name) {
-    static const constexpr std::string_view query_sv = query;
-    static std::weak_ptr<sqlite3_stmt> static_statement;
-    if (!hunt::sql::ensure_prepared(static_statement, query_sv)) {
-        LOG(DEV_WARNING, "Failed to prepare '{}' query!", name);
-        return false;
+size_t hash_nocase(std::wstring_view str) noexcept {
+    // FNV-1a
+    uint64_t hash = 0xcbf29ce484222325;
+    for (auto chr : str) {
+        hash ^= static_cast<uint64_t>(to_lower_ascii(chr));
+        hash *= 0x100000001b3;
     }
+    return static_cast<size_t>(hash);
+}
 
-    const std::shared_ptr<sqlite3_stmt> statement{static_statement};
-    sqlite3_reset(statement.get());
+/**
+ * @brief Compares two strings, ignoring ASCII case.
+ *
+ * @param lhs The first string.
+ * @param rhs The second string.
+ * @return True if the strings are equal.
+ */
+bool equals_nocase(std::wstring_view lhs, std::wstring_view rhs) noexcept {
+    return std::ranges::equal(lhs, rhs, {}, to_lower_ascii, to_lower_ascii);
+}
+
+struct NoCaseHash {
+    using is_transparent = void;
+
+    size_t operator()(std::wstring_view str) const noexcept { return hash_nocase(str); }
+};
+
+struct NoCaseEqual {
+    using is_transparent = void;
+
+    bool operator()(std::wstring_view lhs, std::wstring_view rhs) const noexcept {
+        return equals_nocase(lhs, rhs);
+    }
+};
 
+using NoCaseSet = std::unordered_set<std::wstring, NoCaseHash, NoCaseEqual>;
+
+using EnemyDropKey = std::pair<std::wstring, std::wstring>;
+using EnemyDropKeyView = std::pair<std::wstring_view, std::wstring_view>;
+
+struct EnemyDropKeyHash {
+    using is_transparent = void;
+
+    size_t operator()(const EnemyDropKeyView& key) const noexcept {
+        auto hash = hash_nocase(key.first);
+        // Same mixing as boost::hash_combine
+        hash ^= hash_nocase(key.second) + 0x9e3779b9 + (hash << 6) + (hash >> 2);
+        return hash;
+    }
+};
+
+struct EnemyDropKeyEqual {
+    using is_transparent = void;
+
+    bool operator()(const EnemyDropKeyView& lhs, const EnemyDropKeyView& rhs) const noexcept {
+        return equals_nocase(lhs.first, rhs.first) && equals_nocase(lhs.second, rhs.second);
+    }
+};
+
+struct DropRules {
+    // Every balance in `Items`
+    NoCaseSet items;
+    // Every balance which has a drop without an enemy class
+    NoCaseSet world_drops;
+    // Maps (balance, enemy class) to the required extra item pool, or nullopt if any is fine.
+    // There's a unique constraint on these two columns, so there's only ever a single pool.
+    std::unordered_map<EnemyDropKey,
+                       std::optional<std::wstring>,
+                       EnemyDropKeyHash,
+                       EnemyDropKeyEqual>
+        enemy_drops;
+};
+
+std::weak_ptr<sqlite3_stmt> load_statement{};
+std::optional<DropRules> drop_rules{};
+
+/**
+ * @brief Gets the text in a column.
+ *
+ * @param statement The statement to read from.
+ * @param col The column to read.
+ * @return The text, or nullopt if the column is null.
+ */
+std::optional<std::wstring> get_text_column(sqlite3_stmt* statement, int col) {
+    if (sqlite3_column_type(statement, col) == SQLITE_NULL) {
+        return std::nullopt;
+    }
+
+    // Sqlite docs say we must call text16 before bytes16 to make sure that type conversions
+    // have been done first
     static_assert(sizeof(wchar_t) == sizeof(char16_t));
+    auto ptr = reinterpret_cast<const wchar_t*>(sqlite3_column_text16(statement, col));
+    const size_t size = sqlite3_column_bytes16(statement, col) / sizeof(wchar_t);
 
-    auto res =
-        sqlite3_bind_text16(statement.get(), 1, balance_name.data(),
-                            static_cast<int>(balance_name.size() * sizeof(wchar_t)), SQLITE_STATIC);
-    if (res != SQLITE_OK) {
-        LOG(DEV_WARNING, "Failed to bind balance name for '{}' query: {}", name,
-            sqlite3_errstr(res));
-        return false;
+    return std::wstring{ptr, size};
+}
+
+/**
+ * @brief Gets the drop rules, loading them from the db if required.
+ * @note These should normally have already been loaded on enable, this is just a fallback in case
+ *       that failed.
+ *
+ * @return A pointer to the drop rules, or nullptr if they failed to load.
+ */
+const DropRules* get_drop_rules(void) {
+    if (drop_rules.has_value()) {
+        return &*drop_rules;
     }
 
-    res = sqlite3_step(statement.get());
-    if (res != SQLITE_ROW) {
-        LOG(DEV_WARNING, "Failed to step '{}' query: {}", name, sqlite3_errstr(res));
-        return false;
+    static const constinit std::string_view load_query =
+        "SELECT Balance, NULL, NULL, 0 FROM Items"
+        " UNION ALL"
+        " SELECT ItemBalance, EnemyClass, ExtraItemPool, 1 FROM Drops";
+    if (!hunt::sql::ensure_prepared(load_statement, load_query)) {
+        LOG(DEV_WARNING, "Failed to prepare drop rules query!");
+        return nullptr;
+    }
+
+    const std::shared_ptr<sqlite3_stmt> statement{load_statement};
+    sqlite3_reset(statement.get());
+
+    DropRules rules{};
+    while (true) {
+        auto res = sqlite3_step(statement.get());
+        if (res == SQLITE_DONE) {
+            break;
+        }
+        if (res != SQLITE_ROW) {
+            LOG(DEV_WARNING, "Failed to load drop rules: {}", sqlite3_errstr(res));
+            return nullptr;
+        }
+
+        auto balance = get_text_column(statement.get(), 0);
+        if (!balance) {
+            continue;
+        }
+
+        if (sqlite3_column_int(statement.get(), 3) == 0) {
+            rules.items.insert(std::move(*balance));
+            continue;
+        }
+
+        auto enemy_cls = get_text_column(statement.get(), 1);
+        if (!enemy_cls) {
+            rules.world_drops.insert(std::move(*balance));
+            continue;
+        }
+
+        rules.enemy_drops.emplace(EnemyDropKey{std::move(*balance), std::move(*enemy_cls)},
+                                  get_text_column(statement.get(), 2));
     }
 
-    return sqlite3_column_int(statement.get(), 0) != 0;
+    // Don't hold the read transaction open
+    sqlite3_reset(statement.get());
+
+    drop_rules = std::move(rules);
+    return &*drop_rules;
 }
-// NOLINTEND(cppcoreguidelines-pro-bounds-array-to-pointer-decay)
+
 }  // namespace
 
 namespace hunt::drops {
 
+void load_drop_rules(void) {
+    if (get_drop_rules() == nullptr) {
+        LOG(DEV_WARNING, "Failed to load drop rules on enable, will retry on the next drop");
+    }
+}
+
 bool is_balance_in_db(std::wstring_view balance_name) {
-    static const constexpr char query[] = "SELECT EXISTS (SELECT 1 FROM Items WHERE Balance = ?)";
-    static const constexpr char name[] = "is_balance_in_db";
-    return run_single_bal_bool_query<query, name>(balance_name);
+    const auto* rules = get_drop_rules();
+    return rules != nullptr && rules->items.contains(balance_name);
 }
 
 bool may_balance_world_drop(std::wstring_view balance_name) {
-    static const constexpr char query[] =
-        "SELECT EXISTS (SELECT 1 FROM Drops WHERE ItemBalance = ? and EnemyClass IS NULL)";
-    static const constexpr char name[] = "may_balance_world_drop";
-    return run_single_bal_bool_query<query, name>(balance_name);
+    const auto* rules = get_drop_rules();
+    return rules != nullptr && rules->world_drops.contains(balance_name);
 }
 
 bool is_valid_drop(std::wstring_view balance_name,
                    std::wstring_view actor_cls,
                    std::optional<std::wstring_view> extra_item_pool_name) {
-    static const constinit std::string_view query =
-        "SELECT EXISTS ("
-        "SELECT 1 FROM Drops WHERE"
-        " ItemBalance = ?"
-        " and EnemyClass = ?"
-        " and (ExtraItemPool IS NULL or ExtraItemPool = ?)"
-        ")";
-    static std::weak_ptr<sqlite3_stmt> static_statement;
-    if (!hunt::sql::ensure_prepared(static_statement, query)) {
-        LOG(DEV_WARNING, "Failed to prepare 'is_valid_drop' query!");
+    const auto* rules = get_drop_rules();
+    if (rules == nullptr) {
         return false;
     }
 
-    const std::shared_ptr<sqlite3_stmt> statement{static_statement};
-    sqlite3_reset(statement.get());
-
-    static_assert(sizeof(wchar_t) == sizeof(char16_t));
-
-    auto bind_str = [&statement](std::wstring_view str, int idx, std::string_view field) {
-        auto res =
-            sqlite3_bind_text16(statement.get(), idx, str.data(),
-                                static_cast<int>(str.size() * sizeof(wchar_t)), SQLITE_STATIC);
-        if (res != SQLITE_OK) {
-            LOG(DEV_WARNING, "Failed to bind {} for 'is_valid_drop' query: {}", field,
-                sqlite3_errstr(res));
-            return false;
-        }
-        return true;
-    };
-
-    if (!bind_str(balance_name, 1, "balance name")) {
-        return false;
-    }
-    if (!bind_str(actor_cls, 2, "actor class")) {
+    auto iter = rules->enemy_drops.find(EnemyDropKeyView{balance_name, actor_cls});
+    if (iter == rules->enemy_drops.end()) {
         return false;
     }
-    if (extra_item_pool_name) {
-        if (!bind_str(*extra_item_pool_name, 3, "extra item pool")) {
-            return false;
-        }
-    } else {
-        auto res = sqlite3_bind_null(statement.get(), 3);
-        if (res != SQLITE_OK) {
-            // Note hardcoding the field in the hopes it gets inlined with the other call
-            LOG(DEV_WARNING, "Failed to bind {} for 'is_valid_drop' query: {}", "extra item pool",
-                sqlite3_errstr(res));
-            return false;
-        }
-    }
 
-    auto res = sqlite3_step(statement.get());
-    if (res != SQLITE_ROW) {
-        LOG(DEV_WARNING, "Failed to step 'is_valid_drop' query: {}", sqlite3_errstr(res));
-        return false;
+    const auto& required_pool = iter->second;
+    if (!required_pool) {
+        return true;
     }
-
-    return sqlite3_column_int(statement.get(), 0) != 0;
+    return extra_item_pool_name && equals_nocase(*required_pool, *extra_item_pool_name);
 }
 
 }  // namespace hunt::drops
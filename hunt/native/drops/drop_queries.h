@@ -5,6 +5,12 @@
 
 namespace hunt::drops {
 
+/**
+ * @brief Loads the drop rules from the db, if they haven't been already.
+ * @note The rules are kept even after the db gets closed.
+ */
+void load_drop_rules(void);
+
 /**
  * @brief Checks if an item balance is included in the db.
  *
@@ -5,6 +5,7 @@
 #include "unrealsdk/unreal/properties/zarrayproperty.h"
 #include "unrealsdk/unreal/properties/zobjectproperty.h"
 #include "unrealsdk/unreal/properties/zstructproperty.h"
+#include "unrealsdk/unreal/wrappers/weak_pointer.h"
 #include "unrealsdk/unreal/wrappers/wrapped_array.h"
 #include "unrealsdk/unreal/wrappers/wrapped_struct.h"
 #include "unrealsdk/unrealsdk.h"
@@ -13,10 +14,50 @@
 
 using namespace unrealsdk::unreal;
 
+/*
+When an enemy dies, every item it drops gets constructed one after the other, each of which needs to
+find it's matching request. Rather than scanning every item in every request each time, we build an
+index of the first request containing each balance, and reuse it for the whole burst.
+
+We consider the requests array unchanged as long as it's data pointer and size stay the same. Since
+it might still have been modified in place, we double check the request we found still contains our
+balance. An in place refill could also add new requests without moving the data, so if we don't find
+our balance at all, we treat that the same way. In either case, unless we've only just built it, we
+rebuild the index and try once more.
+*/
+
 namespace hunt::drops {
 
-std::optional<std::pair<UObject*, std::optional<std::wstring>>> find_matching_drop_request(
-    UObject* balance) {
+namespace {
+
+std::optional<WeakPointer> cached_spawn_loot_manager{};
+
+struct RequestIndex {
+    const void* data = nullptr;
+    size_t size = 0;
+    std::unordered_map<UObject*, size_t> first_request_by_balance;
+};
+RequestIndex request_index{};
+
+// Not all actors have these properties, so we cache the lookup per class - nullptr if it doesn't
+// exist on that class.
+using PropertyCache = std::unordered_map<UClass*, ZObjectProperty*>;
+PropertyCache balance_component_props{};
+PropertyCache extra_item_pool_props{};
+
+/**
+ * @brief Gets the spawn loot manager, walking the singleton chain if it's not cached.
+ *
+ * @return The spawn loot manager.
+ */
+UObject* get_spawn_loot_manager(void) {
+    if (cached_spawn_loot_manager) {
+        auto spawn_loot_manager = **cached_spawn_loot_manager;
+        if (spawn_loot_manager != nullptr) {
+            return spawn_loot_manager;
+        }
+    }
+
     static const UObject* engine =
         unrealsdk::find_object(L"OakGameEngine"_fn, L"/Engine/Transient.OakGameEngine_0");
 
@@ -32,67 +73,171 @@ std::optional<std::pair<UObject*, std::optional<std::wstring>>> find_matching_dr
         oak_singletons->Class()->find_prop_and_validate<ZObjectProperty>(L"SpawnLootManager"_fn);
     auto spawn_loot_manager = oak_singletons->get<ZObjectProperty>(spawn_loot_manager_prop);
 
-    static const auto dropped_pickup_requests_prop =
-        spawn_loot_manager->Class()->find_prop_and_validate<ZArrayProperty>(
-            L"DroppedPickupRequests"_fn);
-    auto dropped_pickup_requests =
-        spawn_loot_manager->get<ZArrayProperty>(dropped_pickup_requests_prop);
+    cached_spawn_loot_manager.emplace(spawn_loot_manager);
+    return spawn_loot_manager;
+}
 
-    for (size_t i = 0; i < dropped_pickup_requests.size(); i++) {
-        auto request = dropped_pickup_requests.get_at<ZStructProperty>(i);
+/**
+ * @brief Gets the actor which made a drop request.
+ *
+ * @param request The request to inspect.
+ * @return The actor, or nullptr if it doesn't have one.
+ */
+UObject* get_request_actor(const WrappedStruct& request) {
+    static const auto context_actor_prop =
+        request.type->find_prop_and_validate<ZObjectProperty>(L"ContextActor"_fn);
+    return request.get<ZObjectProperty>(context_actor_prop);
+}
 
-        static const auto context_actor_prop =
-            request.type->find_prop_and_validate<ZObjectProperty>(L"ContextActor"_fn);
-        auto actor = request.get<ZObjectProperty>(context_actor_prop);
-        if (actor == nullptr) {
-            continue;
+/**
+ * @brief Calls a function on every balance selected in a drop request.
+ *
+ * @param request The request to inspect.
+ * @param func The function to call. Returns true to stop iterating.
+ * @return True if iteration was stopped early.
+ */
+bool for_each_request_balance(const WrappedStruct& request,
+                              const std::function<bool(UObject*)>& func) {
+    static const auto selected_inv_info_prop =
+        request.type->find_prop_and_validate<ZArrayProperty>(L"SelectedInventoryInfos"_fn);
+    auto selected_inv_info = request.get<ZArrayProperty>(selected_inv_info_prop);
+
+    for (size_t i = 0; i < selected_inv_info.size(); i++) {
+        auto info = selected_inv_info.get_at<ZStructProperty>(i);
+
+        static const auto inv_bal_prop =
+            info.type->find_prop_and_validate<ZObjectProperty>(L"InventoryBalanceData"_fn);
+        if (func(info.get<ZObjectProperty>(inv_bal_prop))) {
+            return true;
         }
+    }
+    return false;
+}
 
-        static const auto selected_inv_info_prop =
-            request.type->find_prop_and_validate<ZArrayProperty>(L"SelectedInventoryInfos"_fn);
-        auto selected_inv_info = request.get<ZArrayProperty>(selected_inv_info_prop);
-
-        auto found_any = false;
-        for (size_t j = 0; j < selected_inv_info.size(); j++) {
-            auto info = selected_inv_info.get_at<ZStructProperty>(j);
+/**
+ * @brief Checks if a request is still a valid match for a balance.
+ *
+ * @param request The request to check.
+ * @param balance The balance to look for.
+ * @return True if the request has an actor, and contains the balance.
+ */
+bool request_matches(const WrappedStruct& request, UObject* balance) {
+    return get_request_actor(request) != nullptr
+           && for_each_request_balance(request,
+                                       [balance](UObject* other) { return other == balance; });
+}
 
-            static const auto inv_bal_prop =
-                info.type->find_prop_and_validate<ZObjectProperty>(L"InventoryBalanceData"_fn);
-            if (info.get<ZObjectProperty>(inv_bal_prop) == balance) {
-                found_any = true;
-                break;
-            }
-        }
-        if (!found_any) {
+/**
+ * @brief Rebuilds the request index.
+ *
+ * @param requests The dropped pickup requests array.
+ */
+void rebuild_request_index(const WrappedArray& requests) {
+    request_index.data = requests.base->data;
+    request_index.size = requests.size();
+    request_index.first_request_by_balance.clear();
+
+    for (size_t i = 0; i < requests.size(); i++) {
+        auto request = requests.get_at<ZStructProperty>(i);
+        if (get_request_actor(request) == nullptr) {
             continue;
         }
 
-        const UObject* bal_comp = nullptr;
-        try {
-            // Deliberately not using a cached property, since this does not exist on all actors
-            bal_comp = actor->get<ZObjectProperty>(L"BalanceComponent"_fn);
-        } catch (const std::invalid_argument&) {
-            return {{actor, std::nullopt}};
-        }
+        for_each_request_balance(request, [i](UObject* balance) {
+            // Don't overwrite earlier requests, we always want to match the first one
+            request_index.first_request_by_balance.try_emplace(balance, i);
+            return false;
+        });
+    }
+}
 
-        if (bal_comp == nullptr) {
-            return {{actor, std::nullopt}};
-        }
+/**
+ * @brief Looks up an object property on a class, caching the result.
+ *
+ * @param cache The cache to use.
+ * @param cls The class to look up the property on.
+ * @param name The name of the property.
+ * @return The property, or nullptr if it doesn't exist on this class.
+ */
+ZObjectProperty* find_object_prop_cached(PropertyCache& cache, UClass* cls, const FName& name) {
+    auto iter = cache.find(cls);
+    if (iter != cache.end()) {
+        return iter->second;
+    }
 
-        const UObject* extra_item_pool = nullptr;
-        try {
-            extra_item_pool = bal_comp->get<ZObjectProperty>(L"ExtraItemPoolToDropOnDeath"_fn);
-        } catch (const std::invalid_argument&) {
-            return {{actor, std::nullopt}};
-        }
-        if (extra_item_pool == nullptr) {
-            return {{actor, std::nullopt}};
-        }
+    ZObjectProperty* prop = nullptr;
+    try {
+        prop = cls->find_prop_and_validate<ZObjectProperty>(name);
+    } catch (const std::invalid_argument&) {
+        // Leave as nullptr
+    }
+
+    cache.emplace(cls, prop);
+    return prop;
+}
+
+}  // namespace
+
+std::optional<std::pair<UObject*, std::optional<std::wstring>>> find_matching_drop_request(
+    UObject* balance) {
+    auto spawn_loot_manager = get_spawn_loot_manager();
+
+    static const auto dropped_pickup_requests_prop =
+        spawn_loot_manager->Class()->find_prop_and_validate<ZArrayProperty>(
+            L"DroppedPickupRequests"_fn);
+    auto dropped_pickup_requests =
+        spawn_loot_manager->get<ZArrayProperty>(dropped_pickup_requests_prop);
+
+    bool rebuilt = false;
+    if (request_index.data != dropped_pickup_requests.base->data
+        || request_index.size != dropped_pickup_requests.size()) {
+        rebuild_request_index(dropped_pickup_requests);
+        rebuilt = true;
+    }
+
+    auto iter = request_index.first_request_by_balance.find(balance);
+    if (!rebuilt
+        && (iter == request_index.first_request_by_balance.end()
+            || !request_matches(dropped_pickup_requests.get_at<ZStructProperty>(iter->second),
+                                balance))) {
+        // May have been modified in place since we built the index, try again
+        rebuild_request_index(dropped_pickup_requests);
+        iter = request_index.first_request_by_balance.find(balance);
+    }
+    if (iter == request_index.first_request_by_balance.end()) {
+        return std::nullopt;
+    }
+
+    auto actor = get_request_actor(dropped_pickup_requests.get_at<ZStructProperty>(iter->second));
 
-        return {{actor, extra_item_pool->get_path_name()}};
+    auto bal_comp_prop =
+        find_object_prop_cached(balance_component_props, actor->Class(), L"BalanceComponent"_fn);
+    if (bal_comp_prop == nullptr) {
+        return {{actor, std::nullopt}};
     }
+    auto bal_comp = actor->get<ZObjectProperty>(bal_comp_prop);
+    if (bal_comp == nullptr) {
+        return {{actor, std::nullopt}};
+    }
+
+    auto extra_item_pool_prop = find_object_prop_cached(extra_item_pool_props, bal_comp->Class(),
+                                                        L"ExtraItemPoolToDropOnDeath"_fn);
+    if (extra_item_pool_prop == nullptr) {
+        return {{actor, std::nullopt}};
+    }
+    auto extra_item_pool = bal_comp->get<ZObjectProperty>(extra_item_pool_prop);
+    if (extra_item_pool == nullptr) {
+        return {{actor, std::nullopt}};
+    }
+
+    return {{actor, extra_item_pool->get_path_name()}};
+}
 
-    return std::nullopt;
+void reset_drop_request_cache(void) {
+    cached_spawn_loot_manager = std::nullopt;
+    request_index = {};
+    balance_component_props.clear();
+    extra_item_pool_props.clear();
 }
 
 }  // namespace hunt::drops
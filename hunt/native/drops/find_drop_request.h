@@ -20,6 +20,11 @@ namespace hunt::drops {
 std::optional<std::pair<unrealsdk::unreal::UObject*, std::optional<std::wstring>>>
 find_matching_drop_request(unrealsdk::unreal ::UObject* balance);
 
+/**
+ * @brief On world change, resets all the cached objects and properties used to find drop requests.
+ */
+void reset_drop_request_cache(void);
+
 }  // namespace hunt::drops
 
 #endif /* HUNT_NATIVE_DROPS_DROP_REQUESTS_H */
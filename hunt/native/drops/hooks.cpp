@@ -15,6 +15,7 @@
 #include "drop_queries.h"
 #include "find_drop_request.h"
 #include "hooks.h"
+#include "stats.h"
 
 using namespace unrealsdk::unreal;
 
@@ -77,11 +78,15 @@ const constexpr std::wstring_view DROP_HOOK_FUNC_NAME =
     L"BP_OakInventoryItemPickup.BP_OakInventoryItemPickup_C:UserConstructionScript";
 
 bool drop_hook(unrealsdk::hook_manager::Details& details) {
+    const stats::ScopedTimer timer{stats::Timer::DROP_HOOK};
+    stats::increment(stats::Counter::DROP_HOOK_CALLS);
+
     static auto pickup_category_prop =
         details.obj->Class()->find_prop_and_validate<ZObjectProperty>(L"PickupCategory"_fn);
 
     if (INVENTORY_CATEGORIES_TO_IGNORE.contains(
             details.obj->get<ZObjectProperty>(pickup_category_prop))) {
+        stats::increment(stats::Counter::DROP_HOOK_IGNORED_CATEGORY);
         return false;
     }
 
@@ -89,6 +94,7 @@ bool drop_hook(unrealsdk::hook_manager::Details& details) {
     static auto role_prop = details.obj->Class()->find_prop_and_validate<ZByteProperty>(L"Role"_fn);
     static const auto ROLE_Authority = 3;  // NOLINT(readability-identifier-naming)
     if (details.obj->get<ZByteProperty>(role_prop) != ROLE_Authority) {
+        stats::increment(stats::Counter::DROP_HOOK_NOT_AUTHORITY);
         return false;
     }
 
@@ -96,6 +102,7 @@ bool drop_hook(unrealsdk::hook_manager::Details& details) {
         L"CachedInventoryBalanceComponent"_fn);
     auto bal_comp = details.obj->get<ZObjectProperty>(bal_comp_prop);
     if (bal_comp == nullptr) {
+        stats::increment(stats::Counter::DROP_HOOK_NO_BALANCE);
         return false;
     }
 
@@ -105,28 +112,40 @@ bool drop_hook(unrealsdk::hook_manager::Details& details) {
     // Not sure if this is a real thing that can happen anymore, but going to check early to skip
     // more expensive checks just in case
     if (balance == nullptr) {
+        stats::increment(stats::Counter::DROP_HOOK_NO_BALANCE);
         return false;
     }
 
     auto balance_name = balance::get_inventory_balance_name(bal_comp);
 
-    if (!is_balance_in_db(balance_name)) {
+    auto [in_db, may_world_drop] =
+        stats::timed(stats::Timer::DROP_HOOK_BALANCE_LOOKUP, [&balance_name]() {
+            auto in_db = is_balance_in_db(*balance_name);
+            return std::make_pair(in_db, in_db && may_balance_world_drop(*balance_name));
+        });
+    if (!in_db) {
+        stats::increment(stats::Counter::DROP_HOOK_NOT_IN_DB);
         return false;
     }
-    if (may_balance_world_drop(balance_name)) {
+    if (may_world_drop) {
+        stats::increment(stats::Counter::DROP_HOOK_WORLD_DROPS);
         mark_valid_drop(details.obj);
         coop::transmit_valid_pickup_to_clients(details.obj);
     }
 
     // This needs to take the actual balance object, not the possibly expanded one, so that we find
     // the right request
-    auto request = find_matching_drop_request(balance);
+    auto request = stats::timed(stats::Timer::DROP_HOOK_REQUEST_SCAN,
+                                [balance]() { return find_matching_drop_request(balance); });
     if (!request) {
+        stats::increment(stats::Counter::DROP_HOOK_NO_REQUEST);
         return false;
     }
     auto actor_cls = request->first->Class()->get_path_name();
 
-    if (is_valid_drop(balance_name, actor_cls, request->second)) {
+    if (stats::timed(stats::Timer::DROP_HOOK_VALID_DROP_LOOKUP,
+                     [&]() { return is_valid_drop(*balance_name, actor_cls, request->second); })) {
+        stats::increment(stats::Counter::DROP_HOOK_ENEMY_DROPS);
         mark_valid_drop(details.obj);
         coop::transmit_valid_pickup_to_clients(details.obj);
     }
@@ -138,6 +157,9 @@ const constexpr std::wstring_view ITEMCARD_HOOK_FUNC_NAME =
     L"/Script/GbxInventory.InventoryItemPickup:OnLookedAtByPlayer";
 
 bool itemcard_hook(unrealsdk::hook_manager::Details& details) {
+    const stats::ScopedTimer timer{stats::Timer::ITEMCARD_HOOK};
+    stats::increment(stats::Counter::ITEMCARD_HOOK_CALLS);
+
     /*
     This hook is called for both the small weapon type icon, as well as the full item card.
     OakUseComponent::PickupInteractionDistance is 450, GFxItemCard::ShowItemCardDistance is 448.
@@ -154,6 +176,7 @@ bool itemcard_hook(unrealsdk::hook_manager::Details& details) {
 
     if (details.args->get<ZFloatProperty>(new_distance_prop) > min_itemcard_distance) {
         // Not viewing the full item card
+        stats::increment(stats::Counter::ITEMCARD_HOOK_TOO_FAR);
         return false;
     }
 
@@ -167,11 +190,13 @@ bool itemcard_hook(unrealsdk::hook_manager::Details& details) {
     auto balance_name =
         balance::get_inventory_balance_name(details.obj->get<ZObjectProperty>(bal_comp_prop));
 
+    stats::increment(stats::Counter::ITEMCARD_HOOK_VALID_DROPS);
+
     if (!drop_callback) {
         return false;
     }
     const py::gil_scoped_acquire gil{};
-    drop_callback(balance_name);
+    drop_callback(*balance_name);
 
     return false;
 }
@@ -181,6 +206,8 @@ const constexpr std::wstring_view WORLD_CHANGE_HOOK_FUNC_NAME =
 
 bool world_change_hook(unrealsdk::hook_manager::Details& /*details*/) {
     valid_pickups.clear();
+    balance::clear_balance_name_cache();
+    reset_drop_request_cache();
     coop::reset_state_on_world_change();
     return false;
 }
@@ -188,6 +215,8 @@ bool world_change_hook(unrealsdk::hook_manager::Details& /*details*/) {
 }  // namespace
 
 void enable(void) {
+    load_drop_rules();
+
     unrealsdk::hook_manager::add_hook(DROP_HOOK_FUNC_NAME, unrealsdk::hook_manager::Type::PRE,
                                       HOOK_ID, drop_hook);
     unrealsdk::hook_manager::add_hook(ITEMCARD_HOOK_FUNC_NAME, unrealsdk::hook_manager::Type::PRE,
@@ -7,6 +7,7 @@
 #include "coop.h"
 #include "hooks.h"
 #include "sql.h"
+#include "stats.h"
 
 using namespace unrealsdk::unreal;
 
@@ -63,7 +64,7 @@ PYBIND11_MODULE(drops, m) {
     m.def(
         "get_inventory_balance_name",
         [](const py::object& bal_comp) {
-            return hunt::balance::get_inventory_balance_name(
+            return *hunt::balance::get_inventory_balance_name(
                 pyunrealsdk::type_casters::cast<UObject*>(bal_comp));
         },
         "Gets the name of this item's inventory balance.\n"
@@ -74,6 +75,22 @@ PYBIND11_MODULE(drops, m) {
         "    The inventory balance's name.",
         "bal_comp"_a);
 
+    m.def("get_stats", hunt::drops::stats::get_stats,
+          "Gets the drop detection hooks' stats.\n"
+          "\n"
+          "Counters are simple call/outcome counts. Timers record how long each hook, or\n"
+          "part of one, took. Timer histogram bucket `i` counts durations with a bit\n"
+          "width of `i` in microseconds, i.e. bucket 0 is under 1us, bucket 1 [1us, 2us),\n"
+          "bucket 2 [2us, 4us), etc., with the last bucket holding everything longer.\n"
+          "\n"
+          "Returns:\n"
+          "    A dict with two keys: 'counters', mapping counter names to their counts,\n"
+          "    and 'timers', mapping timer names to dicts of their 'count', 'total_ns',\n"
+          "    'max_ns', and histogram 'buckets'.");
+
+    m.def("reset_stats", hunt::drops::stats::reset_stats,
+          "Resets all the drop detection hooks' stats back to zero.");
+
     m.def(
         "enable",
         []() {
@@ -0,0 +1,121 @@
+#include "pyunrealsdk/pch.h"
+
+#include <array>
+#include <atomic>
+#include <bit>
+#include "stats.h"
+
+/*
+Cheap counters and latency histograms for the hot paths, so that we can tell if a hitch is coming
+from us. The blinky thread runs separately from the hooks, so everything is a relaxed atomic - we
+don't care about ordering, only that nothing gets lost.
+
+Histogram bucket `i` counts durations with a bit width of `i`, in microseconds - i.e. bucket 0 holds
+anything under 1us, bucket 1 [1us, 2us), bucket 2 [2us, 4us), etc. The last bucket holds everything
+longer.
+*/
+
+namespace hunt::drops::stats {
+
+namespace {
+
+const constexpr size_t NUM_COUNTERS = static_cast<size_t>(Counter::COUNT);
+const constexpr size_t NUM_TIMERS = static_cast<size_t>(Timer::COUNT);
+const constexpr size_t NUM_HISTOGRAM_BUCKETS = 20;
+
+const constexpr std::array<const char*, NUM_COUNTERS> COUNTER_NAMES{
+    "drop_hook_calls",       "drop_hook_ignored_category", "drop_hook_not_authority",
+    "drop_hook_no_balance",  "drop_hook_not_in_db",        "drop_hook_no_request",
+    "drop_hook_world_drops", "drop_hook_enemy_drops",      "itemcard_hook_calls",
+    "itemcard_hook_too_far", "itemcard_hook_valid_drops",  "blinky_updates",
+    "blinky_blinks",
+};
+
+const constexpr std::array<const char*, NUM_TIMERS> TIMER_NAMES{
+    "drop_hook",
+    "drop_hook_balance_lookup",
+    "drop_hook_valid_drop_lookup",
+    "drop_hook_request_scan",
+    "itemcard_hook",
+    "blinky_update",
+};
+
+struct Histogram {
+    std::atomic<uint64_t> count;
+    std::atomic<uint64_t> total_ns;
+    std::atomic<uint64_t> max_ns;
+    std::array<std::atomic<uint64_t>, NUM_HISTOGRAM_BUCKETS> buckets;
+};
+
+std::array<std::atomic<uint64_t>, NUM_COUNTERS> counters{};
+std::array<Histogram, NUM_TIMERS> histograms{};
+
+}  // namespace
+
+void increment(Counter counter) {
+    counters.at(static_cast<size_t>(counter)).fetch_add(1, std::memory_order_relaxed);
+}
+
+void record(Timer timer, std::chrono::steady_clock::duration duration) {
+    auto& histogram = histograms.at(static_cast<size_t>(timer));
+
+    const uint64_t nanoseconds = std::max<int64_t>(
+        0, std::chrono::duration_cast<std::chrono::nanoseconds>(duration).count());
+
+    histogram.count.fetch_add(1, std::memory_order_relaxed);
+    histogram.total_ns.fetch_add(nanoseconds, std::memory_order_relaxed);
+
+    auto prev_max = histogram.max_ns.load(std::memory_order_relaxed);
+    while (prev_max < nanoseconds
+           && !histogram.max_ns.compare_exchange_weak(prev_max, nanoseconds,
+                                                      std::memory_order_relaxed)) {}
+
+    const size_t bucket =
+        std::min<size_t>(std::bit_width(nanoseconds / 1000), NUM_HISTOGRAM_BUCKETS - 1);
+    histogram.buckets.at(bucket).fetch_add(1, std::memory_order_relaxed);
+}
+
+py::dict get_stats(void) {
+    py::dict counters_dict{};
+    for (size_t i = 0; i < NUM_COUNTERS; i++) {
+        counters_dict[COUNTER_NAMES.at(i)] = counters.at(i).load(std::memory_order_relaxed);
+    }
+
+    py::dict timers_dict{};
+    for (size_t i = 0; i < NUM_TIMERS; i++) {
+        const auto& histogram = histograms.at(i);
+
+        py::list buckets{};
+        for (const auto& bucket : histogram.buckets) {
+            buckets.append(bucket.load(std::memory_order_relaxed));
+        }
+
+        py::dict timer_dict{};
+        timer_dict["count"] = histogram.count.load(std::memory_order_relaxed);
+        timer_dict["total_ns"] = histogram.total_ns.load(std::memory_order_relaxed);
+        timer_dict["max_ns"] = histogram.max_ns.load(std::memory_order_relaxed);
+        timer_dict["buckets"] = buckets;
+        timers_dict[TIMER_NAMES.at(i)] = timer_dict;
+    }
+
+    py::dict output{};
+    output["counters"] = counters_dict;
+    output["timers"] = timers_dict;
+    return output;
+}
+
+void reset_stats(void) {
+    for (auto& counter : counters) {
+        counter.store(0, std::memory_order_relaxed);
+    }
+    for (auto& histogram : histograms) {
+        histogram.count.store(0, std::memory_order_relaxed);
+        histogram.total_ns.store(0, std::memory_order_relaxed);
+        histogram.max_ns.store(0, std::memory_order_relaxed);
+        for (auto& bucket : histogram.buckets) {
+            bucket.store(0, std::memory_order_relaxed);
+        }
+    }
+}
+
+}  // namespace hunt::drops::stats
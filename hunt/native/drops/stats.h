@@ -0,0 +1,95 @@
+#ifndef HUNT_NATIVE_DROPS_STATS_H
+#define HUNT_NATIVE_DROPS_STATS_H
+
+#include "pyunrealsdk/pch.h"
+
+namespace hunt::drops::stats {
+
+enum class Counter : uint8_t {
+    DROP_HOOK_CALLS,
+    DROP_HOOK_IGNORED_CATEGORY,
+    DROP_HOOK_NOT_AUTHORITY,
+    DROP_HOOK_NO_BALANCE,
+    DROP_HOOK_NOT_IN_DB,
+    DROP_HOOK_NO_REQUEST,
+    DROP_HOOK_WORLD_DROPS,
+    DROP_HOOK_ENEMY_DROPS,
+    ITEMCARD_HOOK_CALLS,
+    ITEMCARD_HOOK_TOO_FAR,
+    ITEMCARD_HOOK_VALID_DROPS,
+    BLINKY_UPDATES,
+    BLINKY_BLINKS,
+    COUNT,
+};
+
+enum class Timer : uint8_t {
+    DROP_HOOK,
+    DROP_HOOK_BALANCE_LOOKUP,
+    DROP_HOOK_VALID_DROP_LOOKUP,
+    DROP_HOOK_REQUEST_SCAN,
+    ITEMCARD_HOOK,
+    BLINKY_UPDATE,
+    COUNT,
+};
+
+/**
+ * @brief Increments one of the counters.
+ *
+ * @param counter The counter to increment.
+ */
+void increment(Counter counter);
+
+/**
+ * @brief Records a duration into one of the timer histograms.
+ *
+ * @param timer The timer to record into.
+ * @param duration The duration to record.
+ */
+void record(Timer timer, std::chrono::steady_clock::duration duration);
+
+/**
+ * @brief Gets all stats, in the format they're returned to python.
+ *
+ * @return The stats dict.
+ */
+py::dict get_stats(void);
+
+/**
+ * @brief Resets all stats back to zero.
+ */
+void reset_stats(void);
+
+/**
+ * @brief RAII helper which records how long it was alive for into a timer.
+ */
+class ScopedTimer {
+   public:
+    explicit ScopedTimer(Timer timer) : timer(timer), start(std::chrono::steady_clock::now()) {}
+    ~ScopedTimer() { record(this->timer, std::chrono::steady_clock::now() - this->start); }
+
+    ScopedTimer(const ScopedTimer&) = delete;
+    ScopedTimer(ScopedTimer&&) = delete;
+    ScopedTimer& operator=(const ScopedTimer&) = delete;
+    ScopedTimer& operator=(ScopedTimer&&) = delete;
+
+   private:
+    Timer timer;
+    std::chrono::steady_clock::time_point start;
+};
+
+/**
+ * @brief Runs a function, recording how long it took into a timer.
+ *
+ * @param timer The timer to record into.
+ * @param func The function to run.
+ * @return The function's return value.
+ */
+template <typename Func>
+auto timed(Timer timer, Func&& func) {
+    const ScopedTimer scoped{timer};
+    return std::forward<Func>(func)();
+}
+
+}  // namespace hunt::drops::stats
+
+#endif /* HUNT_NATIVE_DROPS_STATS_H */
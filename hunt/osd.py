@@ -2,13 +2,18 @@
 
 import string
 from dataclasses import KW_ONLY, dataclass
-from threading import Thread
-from typing import Any
+from functools import cache
+from typing import TYPE_CHECKING, Any
 
-from mods_base import SETTINGS_DIR, BoolOption, GroupedOption
+from mods_base import SETTINGS_DIR, BoolOption, GroupedOption, SliderOption
+from unrealsdk import logging
 
-from .db import open_db
+from .db import cached_query
 from .native import osd
+from .worker import CoalescingWorker
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Mapping
 
 OUTPUT_TEXT_FILE = SETTINGS_DIR / "hunt" / "osd.txt"
 TEMPLATE_TEXT_FILE = SETTINGS_DIR / "hunt" / "osd.template.txt"
@@ -354,32 +359,203 @@ ALL_STATS: tuple[HuntStat, ...] = (
 
 osd_option = GroupedOption("On Screen Display", ALL_STATS, display_name="In Game")
 
+osd_interval_option = SliderOption(
+    "Minimum Update Interval",
+    0,
+    0,
+    5000,
+    100,
+    is_integer=True,
+    description=(
+        "The minimum time between two updates of the displays, in milliseconds. Any changes in the"
+        " meantime are combined into a single update.\n"
+        "\n"
+        "Increase this if updating the displays during a burst of drops causes stutters."
+    ),
+)
+
 STAT_BY_FORMAT_ID: dict[str, HuntStat] = {stat.format_id: stat for stat in ALL_STATS}
 FORMATTER = string.Formatter()
 
 
-def format_stats(format_string: str) -> str:
+@cache
+def compile_stats_query(format_ids: tuple[str, ...]) -> str:
     """
-    Formats a string using the various hunt stats.
+    Combines the queries for multiple stats into a single query.
+
+    Each stat becomes it's own CTE, which returns a single row, and we then select all of them at
+    once - so a single statement, and a single consistent snapshot of the db.
 
     Args:
-        format_string: The string to format.
+        format_ids: The format ids of the stats to include.
     Returns:
-        The formatted string.
+        The combined query, which returns a single row, with one column per stat, in order.
     """
-    kwargs: dict[str, Any] = {}
+    ctes = ",\n".join(
+        f"{format_id}(Value) AS ({STAT_BY_FORMAT_ID[format_id].sql})" for format_id in format_ids
+    )
+    columns = ", ".join(f"{format_id}.Value" for format_id in format_ids)
+    tables = ", ".join(format_ids)
+    return f"WITH {ctes}\nSELECT {columns} FROM {tables}"
 
-    with open_db("r") as cur:
-        for _, format_id, _, _ in FORMATTER.parse(format_string):
-            if format_id is None:
-                continue
-            stat = STAT_BY_FORMAT_ID.get(format_id)
-            if stat is None:
+
+def query_stats(format_ids: Collection[str]) -> dict[str, Any]:
+    """
+    Gets the current values of multiple stats.
+
+    Args:
+        format_ids: The format ids of the stats to get.
+    Returns:
+        A dict mapping each stat's format id to it's current value.
+    """
+    if not format_ids:
+        return {}
+
+    ordered_ids = tuple(sorted(format_ids))
+    (values,) = cached_query(compile_stats_query(ordered_ids))
+    return dict(zip(ordered_ids, values, strict=True))
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """
+    A pre-parsed format string, which can quickly be rendered with the current stats.
+
+    Args:
+        chunks: Tuples of the literal text, and then the field name, conversion, and format spec of
+                the replacement field following it. Only the last chunk may have no field.
+        stats: The format ids of all stats referenced by this plan.
+    """
+
+    chunks: tuple[tuple[str, str | None, str | None, str], ...]
+    stats: frozenset[str]
+
+    def render(self, stats: Mapping[str, Any]) -> str:
+        """
+        Renders this plan using the given stats.
+
+        Args:
+            stats: The stat values to use, as returned by `query_stats`.
+        Returns:
+            The rendered string.
+        """
+        parts: list[str] = []
+        for literal, field_name, conversion, format_spec in self.chunks:
+            parts.append(literal)
+            if field_name is None:
                 continue
-            cur.execute(stat.sql)
-            kwargs[format_id] = cur.fetchone()[0]
 
-    return format_string.format(**kwargs)
+            value, _ = FORMATTER.get_field(field_name, (), stats)
+            value = FORMATTER.convert_field(value, conversion)
+            spec = FORMATTER.vformat(format_spec, (), stats) if "{" in format_spec else format_spec
+            parts.append(format(value, spec))
+
+        return "".join(parts)
+
+
+def compile_format(format_string: str, source: str) -> RenderPlan:
+    """
+    Compiles a format string into a render plan.
+
+    Any fields which don't refer to a known stat are left in the output as is, and reported once
+    here, rather than on every render.
+
+    Args:
+        format_string: The string to compile.
+        source: Where the string came from, for use in error messages.
+    Returns:
+        The compiled render plan.
+    """
+    chunks: list[tuple[str, str | None, str | None, str]] = []
+    referenced_stats: set[str] = set()
+    unknown_fields: list[str] = []
+
+    pending_literal = ""
+    for literal, field_name, format_spec, conversion in FORMATTER.parse(format_string):
+        pending_literal += literal
+        if field_name is None:
+            continue
+
+        # The spec may contain nested fields too
+        field_ids = [field_name]
+        if format_spec and "{" in format_spec:
+            field_ids += [nested for _, nested, _, _ in FORMATTER.parse(format_spec) if nested]
+
+        # Strip off any attribute/index access to get back to the stat
+        format_ids = {field.partition(".")[0].partition("[")[0] for field in field_ids}
+        if not format_ids.issubset(STAT_BY_FORMAT_ID):
+            unknown_fields.append(field_name)
+            pending_literal += (
+                "{"
+                + field_name
+                + ("!" + conversion if conversion else "")
+                + (":" + format_spec if format_spec else "")
+                + "}"
+            )
+            continue
+
+        referenced_stats |= format_ids
+        chunks.append((pending_literal, field_name, conversion, format_spec or ""))
+        pending_literal = ""
+
+    if pending_literal:
+        chunks.append((pending_literal, None, None, ""))
+
+    if unknown_fields:
+        logging.warning(
+            f"[HUNT] Unknown stats in {source}: "
+            + ", ".join(f"{{{field}}}" for field in unknown_fields),
+        )
+
+    return RenderPlan(tuple(chunks), frozenset(referenced_stats))
+
+
+_in_game_plan_cache: dict[str, RenderPlan] = {}
+
+
+def get_in_game_plan(stat: HuntStat) -> RenderPlan:
+    """
+    Gets the compiled render plan for a stat's in game format string.
+
+    Args:
+        stat: The stat to get the plan of.
+    Returns:
+        The compiled render plan.
+    """
+    plan = _in_game_plan_cache.get(stat.format_id)
+    if plan is None:
+        plan = compile_format(stat.in_game_format, f"the in game format for {stat.display_name}")
+        _in_game_plan_cache[stat.format_id] = plan
+    return plan
+
+
+_template_plan_cache: tuple[tuple[int, int], RenderPlan] | None = None
+
+
+def get_template_plan() -> RenderPlan:
+    """
+    Gets the compiled render plan for the template file, creating the file if it doesn't exist.
+
+    Only re-reads the file if its modification time or size changed since last time.
+
+    Returns:
+        The compiled render plan.
+    """
+    global _template_plan_cache
+
+    if not TEMPLATE_TEXT_FILE.exists():
+        create_template_file()
+
+    file_stat = TEMPLATE_TEXT_FILE.stat()
+    key = (file_stat.st_mtime_ns, file_stat.st_size)
+    if _template_plan_cache is not None and _template_plan_cache[0] == key:
+        return _template_plan_cache[1]
+
+    with TEMPLATE_TEXT_FILE.open("r") as template:
+        plan = compile_format(template.read(), TEMPLATE_TEXT_FILE.name)
+
+    _template_plan_cache = (key, plan)
+    return plan
 
 
 def create_template_file() -> None:
@@ -403,9 +579,70 @@ def create_template_file() -> None:
         )
 
 
+@dataclass
+class OutputFileStats:
+    """
+    Diagnostic counters for the output text file.
+
+    Args:
+        writes: How many times the file was actually written.
+        skipped: How many updates were skipped since the text didn't change.
+    """
+
+    writes: int = 0
+    skipped: int = 0
+
+
+output_file_stats = OutputFileStats()
+_last_output_text: str | None = None
+
+
+def write_output_file(text: str) -> None:
+    """
+    Writes the output text file, if the text changed since the last write.
+
+    Writes to a temp file then renames it over the top, so OBS never sees a partially written file.
+
+    Args:
+        text: The text to write.
+    """
+    global _last_output_text
+
+    if _last_output_text is None and OUTPUT_TEXT_FILE.exists():
+        # Compare against whatever was left over from last session too
+        try:
+            with OUTPUT_TEXT_FILE.open("r") as file:
+                _last_output_text = file.read()
+        except OSError:
+            pass
+
+    if text == _last_output_text and OUTPUT_TEXT_FILE.exists():
+        output_file_stats.skipped += 1
+        return
+
+    temp_file = OUTPUT_TEXT_FILE.with_name(OUTPUT_TEXT_FILE.name + ".tmp")
+    with temp_file.open("w") as file:
+        file.write(text)
+    try:
+        temp_file.replace(OUTPUT_TEXT_FILE)
+    except PermissionError:
+        # Whatever's reading the file might not allow it to be replaced, fall back to overwriting it
+        temp_file.unlink(missing_ok=True)
+        with OUTPUT_TEXT_FILE.open("w") as file:
+            file.write(text)
+
+    _last_output_text = text
+    output_file_stats.writes += 1
+
+
 def update_osd() -> None:
     # Updating is expensive, do it in a thread
-    Thread(target=_update_osd_inner).start()
+    _osd_worker.request()
+
+
+def shutdown_osd_worker() -> None:
+    # Still runs any outstanding update first, so this may be called right after `update_osd`
+    _osd_worker.shutdown()
 
 
 def _update_osd_inner() -> None:
@@ -416,20 +653,27 @@ def _update_osd_inner() -> None:
         osd.hide()
         return
 
-    if not TEMPLATE_TEXT_FILE.exists():
-        create_template_file()
+    template_plan = get_template_plan()
+    line_plans = [get_in_game_plan(stat) for stat in ALL_STATS if stat.value]
 
-    with TEMPLATE_TEXT_FILE.open("r") as template, OUTPUT_TEXT_FILE.open("w") as out:
-        out.write(format_stats(template.read()))
+    # Work out every stat we need for both displays, and get them all at once
+    stats = query_stats(template_plan.stats.union(*(plan.stats for plan in line_plans)))
+
+    write_output_file(template_plan.render(stats))
 
     # If nothing to draw
-    if not any(stat.value for stat in ALL_STATS):
+    if not line_plans:
         osd.hide()
         return
 
-    lines_to_draw = [format_stats(stat.in_game_format) for stat in ALL_STATS if stat.value]
-    if not lines_to_draw:
-        return
+    lines_to_draw = [plan.render(stats) for plan in line_plans]
 
     osd.update_lines(lines_to_draw)
     osd.show()
+
+
+_osd_worker = CoalescingWorker(
+    "hunt osd",
+    _update_osd_inner,
+    lambda: osd_interval_option.value / 1000,
+)
@@ -0,0 +1,166 @@
+import sqlite3
+import traceback
+from dataclasses import KW_ONLY, dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from mods_base import BaseOption, ButtonOption, NestedOption, command
+from unrealsdk import logging
+
+from .db import cached_query
+from .db_options import create_item_options
+
+if TYPE_CHECKING:
+    import argparse
+    from collections.abc import Sequence
+
+MAX_SEARCH_RESULTS: int = 100
+
+SEARCH_DESCRIPTION = (
+    "Search for items by name, or by where they drop from.\n"
+    "\n"
+    "To search, type 'hunt_search' followed by what you want to find into the console, e.g."
+    " 'hunt_search graveward'."
+)
+
+
+def _to_fts_query(query: str) -> str:
+    """
+    Converts a user search query into an FTS5 match expression.
+
+    Every word is quoted, so that none of them can be interpreted as FTS syntax, and is turned into
+    a prefix search, so that results show up while still typing out a word.
+
+    Args:
+        query: The user's search query.
+    Returns:
+        The FTS5 match expression.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in query.split())
+
+
+def search_items(query: str) -> list[int]:
+    """
+    Searches for items matching a query.
+
+    Args:
+        query: The user's search query.
+    Returns:
+        A list of matching item ids, best match first.
+    """
+    if not query.split():
+        return []
+
+    try:
+        rows = cached_query(
+            """
+            SELECT
+                rowid
+            FROM
+                ItemSearch
+            WHERE
+                ItemSearch MATCH ?
+            ORDER BY
+                rank
+            LIMIT ?
+            """,
+            (_to_fts_query(query), MAX_SEARCH_RESULTS),
+        )
+    except sqlite3.OperationalError:
+        # If this sqlite build doesn't have FTS5, the table won't exist, fall back to a (slower)
+        # plain text search
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = cached_query(
+            """
+            SELECT
+                ID
+            FROM
+                Items
+            WHERE
+                Name LIKE ? ESCAPE '\\'
+                or Description LIKE ? ESCAPE '\\'
+            ORDER BY
+                Name LIKE ? ESCAPE '\\' DESC,
+                Name
+            LIMIT ?
+            """,
+            (pattern, pattern, pattern, MAX_SEARCH_RESULTS),
+        )
+
+    return [item_id for (item_id,) in rows]
+
+
+@dataclass
+class SearchItemsOption(NestedOption):
+    _: KW_ONLY
+    query: str = ""
+
+    children: Sequence[BaseOption] = field(init=False, default_factory=tuple)  # type: ignore
+
+    # The ids of the items matching the current query. These never change, since searching doesn't
+    # depend on what's been collected, so we only need to rebuild the options around them.
+    _results: Sequence[int] | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        del self.children
+
+    def set_query(self, query: str, results: Sequence[int] | None = None) -> None:
+        """
+        Changes what this option is searching for.
+
+        Args:
+            query: The new search query.
+            results: If not None, the already searched ids of the items matching the query.
+        """
+        self.query = query
+        self._results = results
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Discards the current options, so that they get rebuilt next time they're shown."""
+        self.display_name = f"Search Items: {self.query}" if self.query else "Search Items"
+        self.__dict__.pop("children", None)
+
+    @cached_property
+    def children(self) -> Sequence[BaseOption]:  # pyright: ignore[reportIncompatibleVariableOverride]  # noqa: D102, F811
+        if not self.query:
+            return (ButtonOption("No search entered", description=SEARCH_DESCRIPTION),)
+
+        try:
+            if self._results is None:
+                self._results = search_items(self.query)
+            results = create_item_options(self._results)
+        except Exception:  # noqa: BLE001
+            return (
+                ButtonOption(
+                    "Failed to generate children!",
+                    description=traceback.format_exc(),
+                ),
+            )
+
+        if not results:
+            return (ButtonOption("No matching items", description=SEARCH_DESCRIPTION),)
+        return results
+
+
+search_items_option = SearchItemsOption("Search Items", description=SEARCH_DESCRIPTION)
+
+
+@command(description="Searches the hunt's items, and shows the results in the mod menu.")
+def hunt_search(args: argparse.Namespace) -> None:  # noqa: D103
+    query = " ".join(args.query)
+
+    try:
+        results = search_items(query)
+    except sqlite3.Error:
+        # Still show the query in the menu, which will show the error
+        search_items_option.set_query(query)
+        traceback.print_exc()
+        return
+
+    search_items_option.set_query(query, results)
+    logging.info(f"[HUNT] Found {len(results)} items matching '{query}', see the mod menu.")
+
+
+hunt_search.add_argument("query", nargs="*", help="What to search for.")
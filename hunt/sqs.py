@@ -4,7 +4,8 @@ from typing import TYPE_CHECKING, Any
 
 from mods_base import ENGINE, get_pc, hook
 
-from .db import open_db
+from .db import flush_writes, queue_write
+from .drops import flush_drops
 from .native import drops
 
 if TYPE_CHECKING:
@@ -28,6 +29,9 @@ def sq_hook(
     # of using a single connection for all drops in a single game session.
     drops.close_db()
 
+    # Make sure any drops from before the quit get recorded before it
+    flush_drops()
+
     world = ENGINE.GameViewport.World.Name
 
     station: str
@@ -37,13 +41,14 @@ def sq_hook(
     except IndexError:
         station = "Unknown"
 
-    with open_db("w") as cur:
-        cur.execute(
-            """
-            INSERT INTO
-                SaveQuits (WorldName, Station)
-            VALUES
-                (?, ?)
-            """,
-            (world, station),
-        )
+    queue_write(
+        """
+        INSERT INTO
+            SaveQuits (WorldName, Station)
+        VALUES
+            (?, ?)
+        """,
+        (world, station),
+    )
+    # The game might be about to close, make sure everything's on disk
+    flush_writes()
@@ -18,7 +18,8 @@ else:
         # Import from the old location instead
         from mods_base import raw_keybinds
 
-from .db import open_db
+from .db import cached_query, open_db, queue_write
+from .item_index import get_item_info, get_num_collected, insert_collected
 from .native.drops import get_inventory_balance_name
 
 redeem_token_option = KeybindOption(
@@ -28,7 +29,7 @@ redeem_token_option = KeybindOption(
 )
 
 
-inspected_item_balance: str | None = None
+inspected_item_id: int | None = None
 
 redeem_choice = DialogBoxChoice("Redeem")
 
@@ -40,28 +41,13 @@ redeem_choice = DialogBoxChoice("Redeem")
     dont_show=True,
 )
 def redeem_confirm_dialog(choice: DialogBoxChoice) -> None:
-    global inspected_item_balance
+    global inspected_item_id
     if choice != redeem_choice:
         return
-    assert inspected_item_balance is not None
+    assert inspected_item_id is not None
 
     with open_db("w") as cur:
-        cur.execute(
-            """
-            INSERT INTO
-                Collected (ItemID)
-            SELECT
-                ID
-            FROM
-                Items
-            WHERE
-                Balance = ?
-            RETURNING
-                ID
-            """,
-            (inspected_item_balance,),
-        )
-        collected_id = cur.fetchone()[0]
+        collected_id, _ = insert_collected(cur, inspected_item_id)
         cur.execute(
             """
             INSERT INTO
@@ -72,7 +58,7 @@ def redeem_confirm_dialog(choice: DialogBoxChoice) -> None:
             (collected_id,),
         )
 
-    inspected_item_balance = None
+    inspected_item_id = None
     raw_keybinds.pop()
 
 
@@ -83,44 +69,25 @@ def item_inspect_start_hook(
     _3: Any,
     _4: BoundFunction,
 ) -> None:
-    global inspected_item_balance
+    global inspected_item_id
 
     if redeem_token_option.value is None:
         return
 
-    bal = get_inventory_balance_name(obj.InspectionSourceBalanceComponent)
-    with open_db("r") as cur:
-        cur.execute(
-            """
-            SELECT
-                (not AlreadyCollected) and AvailableTokens > 0,
-                format('Available Tokens: %d', AvailableTokens)
-            FROM
-            (
-                SELECT
-                    EXISTS (
-                        SELECT
-                            1
-                        FROM
-                            Collected as c
-                        LEFT JOIN
-                            Items as i ON c.ItemID = i.ID
-                        WHERE
-                            i.Balance = ?
-                    ) as AlreadyCollected,
-                    (SELECT Tokens FROM AvailableTokens) as AvailableTokens
-            )
-            """,
-            (bal,),
-        )
-        allowed, message = cur.fetchone()
-        if not allowed:
-            return
-    inspected_item_balance = bal
+    # This includes any drops which are still being recorded, so you can't redeem something you just
+    # picked up
+    item = get_item_info(get_inventory_balance_name(obj.InspectionSourceBalanceComponent))
+    if item is None or get_num_collected(item.id) > 0:
+        return
+
+    ((tokens,),) = cached_query("SELECT Tokens FROM AvailableTokens")
+    if tokens <= 0:
+        return
+    inspected_item_id = item.id
 
     show_hud_message(
         f"Press [{redeem_token_option.value}] to redeem using World Drop Tokens",
-        message,
+        f"Available Tokens: {tokens}",
     )
 
     raw_keybinds.push()
@@ -134,10 +101,59 @@ def item_inspect_end_hook(
     _3: Any,
     _4: BoundFunction,
 ) -> None:
-    global inspected_item_balance
-    if inspected_item_balance is not None:
+    global inspected_item_id
+    if inspected_item_id is not None:
         raw_keybinds.pop()
-    inspected_item_balance = None
+    inspected_item_id = None
+
+
+# Keyed on the lowercased mission class, since the db treats them as case insensitive
+_mission_tokens: dict[str, tuple[int, int]] | None = None
+# The lowercased classes of every reward mission which has been completed. Loaded alongside the
+# rewards, and then kept up to date as completions are queued, so this includes any which haven't
+# been written yet.
+_completed_reward_missions: set[str] = set()
+
+
+def get_mission_tokens() -> dict[str, tuple[int, int]]:
+    """
+    Gets the token rewards for each mission, loading them from the db if required.
+
+    Returns:
+        A dict mapping lowercased mission class names to their initial and subsequent rewards.
+    """
+    global _mission_tokens
+    if _mission_tokens is None:
+        rows = cached_query(
+            """
+            SELECT
+                MissionClass, InitialTokens, SubsequentTokens
+            FROM
+                MissionTokens
+            """,
+        )
+        mission_tokens = {
+            mission_class.lower(): (initial, subsequent)
+            for mission_class, initial, subsequent in rows
+        }
+
+        completed_rows = cached_query("SELECT DISTINCT MissionClass FROM CompletedMissions")
+        _completed_reward_missions.clear()
+        _completed_reward_missions.update(
+            mission_class.lower()
+            for (mission_class,) in completed_rows
+            if mission_class.lower() in mission_tokens
+        )
+
+        _mission_tokens = mission_tokens
+    return _mission_tokens
+
+
+def clear_mission_tokens() -> None:
+    """Clears the loaded token rewards, so that they get reloaded from the db next time."""
+    global _mission_tokens
+    _mission_tokens = None
+    _completed_reward_missions.clear()
 
 
 @hook("/Script/GbxMission.Mission:MissionComplete")
@@ -148,51 +164,28 @@ def mission_complete_hook(
     _4: BoundFunction,
 ) -> None:
     mission_class = obj.Class._path_name()
-
-    with open_db("r") as cur:
-        cur.execute(
-            """
-            SELECT
-                'World Drop Token' || IIF(NumTokens > 1, 's', '') || ' Unlocked',
-                '<font color="#00ff00">+'
-                    || NumTokens
-                    || '</font> token'
-                    || IIF(NumTokens > 1, 's', ''),
-                5
-            FROM (
-                SELECT
-                    IIF((SELECT EXISTS (
-                            SELECT
-                                1
-                            FROM
-                                CompletedMissions as c
-                            WHERE
-                                c.MissionClass = ?
-                        )),
-                        t.SubsequentTokens,
-                        t.InitialTokens
-                    ) as NumTokens
-                FROM
-                    MissionTokens as t
-                WHERE
-                    t.MissionClass = ?
-            )
-            """,
-            (mission_class, mission_class),
-        )
-        row = cur.fetchone()
-        if row is not None:
-            title, message, duration = row
-            show_hud_message(title, message, duration)
-            logging.info(html_to_plain_text(f"[HUNT] {title}: {message}"))
-
-    with open_db("w") as cur:
-        cur.execute(
-            """
-            INSERT INTO
-                CompletedMissions (MissionClass)
-            VALUES
-                (?)
-            """,
-            (mission_class,),
-        )
+    mission_key = mission_class.lower()
+
+    rewards = get_mission_tokens().get(mission_key)
+    if rewards is not None:
+        initial_tokens, subsequent_tokens = rewards
+        completed_before = mission_key in _completed_reward_missions
+        _completed_reward_missions.add(mission_key)
+
+        num_tokens = subsequent_tokens if completed_before else initial_tokens
+        plural = "s" if num_tokens > 1 else ""
+
+        title = f"World Drop Token{plural} Unlocked"
+        message = f'<font color="#00ff00">+{num_tokens}</font> token{plural}'
+        show_hud_message(title, message, 5)
+        logging.info(html_to_plain_text(f"[HUNT] {title}: {message}"))
+
+    queue_write(
+        """
+        INSERT INTO
+            CompletedMissions (MissionClass)
+        VALUES
+            (?)
+        """,
+        (mission_class,),
+    )
@@ -0,0 +1,81 @@
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+@dataclass
+class CoalescingWorker:
+    """
+    A single persistent background thread, which runs a function whenever requested.
+
+    Requests made while the function is already running or waiting to run are coalesced - the
+    function runs at most once at a time, and only once more afterwards no matter how many requests
+    were made in the meantime.
+
+    Args:
+        name: The name of the worker thread.
+        target: The function to run.
+        min_interval: A getter for the minimum amount of seconds between two runs.
+    """
+
+    name: str
+    target: Callable[[], None]
+    min_interval: Callable[[], float] = lambda: 0
+
+    _cond: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+    _thread: threading.Thread | None = field(default=None, init=False, repr=False)
+    _dirty: bool = field(default=False, init=False, repr=False)
+    _stopping: bool = field(default=False, init=False, repr=False)
+    _last_run: float = field(default=float("-inf"), init=False, repr=False)
+
+    def request(self) -> None:
+        """Requests the function be run, starting the worker thread if required."""
+        with self._cond:
+            self._dirty = True
+            self._stopping = False
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+            self._cond.notify_all()
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker thread.
+
+        Any outstanding request is still run first. Making another request restarts the thread.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopping:
+                    self._cond.wait()
+
+                if not self._dirty:
+                    self._thread = None
+                    return
+
+                # Keep waiting out the minimum interval, letting more requests pile up, unless we're
+                # trying to shut down
+                delay = self._last_run + self.min_interval() - time.monotonic()
+                if delay > 0 and not self._stopping:
+                    self._cond.wait(delay)
+                    continue
+
+                self._dirty = False
+
+            try:
+                self.target()
+            except Exception:  # noqa: BLE001
+                traceback.print_exc()
+            self._last_run = time.monotonic()